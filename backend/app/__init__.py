@@ -32,7 +32,11 @@ def create_app(config_class=Config):
         supports_credentials=True,
     )
 
+    from app import database
+
+    database.configure(app)
     db.init_app(app)
+    database.init_app(app, db)
     migrate.init_app(app, db)
     login.init_app(app)
 
@@ -48,6 +52,19 @@ def create_app(config_class=Config):
 
     app.register_blueprint(events_bp, url_prefix="/events")
 
+    from app.main.archive import archive_incidents_command
+
+    app.cli.add_command(archive_incidents_command)
+
+    from app.main.spatial_index import publish_snapshot_command
+
+    app.cli.add_command(publish_snapshot_command)
+
+    if app.config.get("METRICS_ENABLED", True):
+        from app import metrics
+
+        metrics.init_app(app, db)
+
     if not app.debug:
         # log file
         if not os.path.exists("logs"):
@@ -116,9 +116,11 @@ def update_location():
         except Exception as _:
             return jsonify({"error": "Location not found"}), 400
 
-        current_user.location = new_location
-        current_user.latitude = float(lat)
-        current_user.longitude = float(lng)
+        # current_user is a read-only cached copy; change the row itself.
+        user = db.session.get(User, current_user.id)
+        user.location = new_location
+        user.latitude = float(lat)
+        user.longitude = float(lng)
 
         db.session.commit()
 
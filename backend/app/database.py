@@ -0,0 +1,101 @@
+"""
+Database engine settings: connection pool options and, for SQLite, the pragmas
+that let readers and writers work at the same time.
+
+SQLite's default rollback journal locks the whole file for the length of every
+write, so a burst of event joins stalls all reads behind it. In WAL mode readers
+keep reading the last committed state while one writer appends to the log, and
+busy_timeout makes a second writer wait for the lock instead of failing with
+"database is locked".
+
+Postgres (and any other server database) gets a sized connection pool with
+pre-ping and recycling, so connections dropped by the server or a proxy are
+replaced instead of surfacing as errors.
+"""
+import sqlalchemy as sa
+from sqlalchemy.engine import make_url
+
+# Pragmas that can be changed per connection; journal_mode is set separately as
+# it is stored in the database file.
+SQLITE_PRAGMAS = (
+    ("synchronous", "SQLITE_SYNCHRONOUS"),
+    ("cache_size", "SQLITE_CACHE_SIZE"),
+    ("mmap_size", "SQLITE_MMAP_SIZE"),
+    ("busy_timeout", "SQLITE_BUSY_TIMEOUT_MS"),
+)
+
+
+def is_sqlite(uri):
+    return make_url(uri).get_backend_name() == "sqlite"
+
+
+def _is_memory(url):
+    return url.database in (None, "", ":memory:") or url.database.startswith("file::memory:")
+
+
+def engine_options(config):
+    """
+    SQLALCHEMY_ENGINE_OPTIONS for the configured database. Options set
+    explicitly in the config take precedence.
+    """
+    url = make_url(config["SQLALCHEMY_DATABASE_URI"])
+    if url.get_backend_name() == "sqlite":
+        # pysqlite's own busy timeout is in seconds; it applies while connecting.
+        options = {
+            "connect_args": {"timeout": config.get("SQLITE_BUSY_TIMEOUT_MS", 5000) / 1000}
+        }
+    else:
+        options = {
+            "pool_size": config.get("DB_POOL_SIZE", 10),
+            "max_overflow": config.get("DB_MAX_OVERFLOW", 20),
+            "pool_timeout": config.get("DB_POOL_TIMEOUT", 30),
+            "pool_recycle": config.get("DB_POOL_RECYCLE", 1800),
+            "pool_pre_ping": config.get("DB_POOL_PRE_PING", True),
+        }
+    options.update(config.get("SQLALCHEMY_ENGINE_OPTIONS") or {})
+    return options
+
+
+def sqlite_pragmas(config, url):
+    """
+    PRAGMA statements run on every new SQLite connection.
+    """
+    statements = []
+    journal_mode = config.get("SQLITE_JOURNAL_MODE")
+    if journal_mode and not _is_memory(url):
+        statements.append(f"PRAGMA journal_mode={journal_mode}")
+    for pragma, key in SQLITE_PRAGMAS:
+        value = config.get(key)
+        if value is not None:
+            statements.append(f"PRAGMA {pragma}={value}")
+    return statements
+
+
+def configure(app):
+    """
+    Fill in SQLALCHEMY_ENGINE_OPTIONS; call before db.init_app(app).
+    """
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = engine_options(app.config)
+
+
+def init_app(app, db):
+    """
+    Run the SQLite pragmas on every connection the app's engine opens.
+    """
+    if not is_sqlite(app.config["SQLALCHEMY_DATABASE_URI"]):
+        return
+
+    with app.app_context():
+        engine = db.engine
+    statements = sqlite_pragmas(app.config, engine.url)
+
+    def on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for statement in statements:
+                cursor.execute(statement)
+        finally:
+            cursor.close()
+
+    if statements:
+        sa.event.listen(engine, "connect", on_connect)
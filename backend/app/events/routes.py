@@ -5,15 +5,62 @@ from app import db
 import sqlalchemy as sa
 from flask_login import current_user
 from app.main.geocoding import geocode_address
-from datetime import datetime
+from app.main.pagination import decode_cursor, encode_cursor, page_size
+from app.events.spatial import event_index
+from datetime import datetime, timezone
 
 
 @bp.route("/")
 def all_events():
+    """
+    List events.
+
+    With ?limit=<n> and/or ?cursor=<token>, returns one page ordered by
+    (start_time, id) as {"events": [...], "next_cursor": token or null}.
+    Otherwise returns every event as a list.
+    """
     if not current_user.is_authenticated:
         return jsonify({"message": "Not logged in"}), 401
-    events = db.session.scalars(sa.select(Event)).all()
-    return jsonify([event.to_dict(user_id=current_user.id) for event in events])
+
+    if "limit" in request.args or "cursor" in request.args:
+        return events_page()
+
+    events = db.session.scalars(Event.select_with_creator()).all()
+    return jsonify(Event.serialize_many(events, user_id=current_user.id))
+
+
+def events_page():
+    try:
+        limit = page_size(request.args.get("limit"))
+        stmt = Event.select_with_creator().order_by(Event.start_time, Event.id)
+        if request.args.get("cursor"):
+            cursor = decode_cursor(request.args["cursor"])
+            start_time = datetime.fromisoformat(cursor["start_time"])
+            event_id = int(cursor["id"])
+            stmt = stmt.where(
+                sa.or_(
+                    Event.start_time > start_time,
+                    sa.and_(Event.start_time == start_time, Event.id > event_id),
+                )
+            )
+    except (KeyError, TypeError, ValueError):
+        return jsonify({"error": "Invalid 'limit' or 'cursor' parameter"}), 400
+
+    events = db.session.scalars(stmt.limit(limit + 1)).all()
+
+    next_cursor = None
+    if len(events) > limit:
+        events = events[:limit]
+        next_cursor = encode_cursor(
+            {"start_time": events[-1].start_time.isoformat(), "id": events[-1].id}
+        )
+
+    return jsonify(
+        {
+            "events": Event.serialize_many(events, user_id=current_user.id),
+            "next_cursor": next_cursor,
+        }
+    ), 200
 
 
 @bp.route("/me")
@@ -23,11 +70,11 @@ def my_events():
         return jsonify({"message": "Not logged in"}), 401
 
     created_events = db.session.scalars(
-        sa.select(Event).where(Event.creator_id == current_user.id)
+        Event.select_with_creator().where(Event.creator_id == current_user.id)
     ).all()
 
     participating_events = db.session.scalars(
-        sa.select(Event)
+        Event.select_with_creator()
         .join(event_attendees)
         .where(
             event_attendees.c.user_id == current_user.id,
@@ -36,13 +83,41 @@ def my_events():
     ).all()
 
     res = {
-        "created": [event.to_dict() for event in created_events],
-        "participating": [event.to_dict() for event in participating_events],
+        "created": Event.serialize_many(created_events),
+        "participating": Event.serialize_many(participating_events),
     }
 
     return jsonify(res), 200
 
 
+@bp.route("/nearby")
+def nearby_events():
+    """
+    Upcoming events within the user's distance preference (miles, default 1),
+    nearest first. Each event has an extra "distance" attribute.
+    """
+    if not current_user.is_authenticated:
+        return jsonify({"message": "Not logged in"}), 401
+    if current_user.latitude is None or current_user.longitude is None:
+        return jsonify({"error": "Set your location to find nearby events"}), 400
+
+    radius = current_user.distance or 1
+    matches = event_index.nearby(current_user.latitude, current_user.longitude, radius)
+    if not matches:
+        return jsonify([]), 200
+
+    distances = dict(matches)
+    events = db.session.scalars(
+        Event.select_with_creator().where(Event.id.in_(distances))
+    ).all()
+    events.sort(key=lambda event: (distances[event.id], event.id))
+
+    res = Event.serialize_many(events, user_id=current_user.id)
+    for event_data in res:
+        event_data["distance"] = round(distances[event_data["id"]], 2)
+    return jsonify(res), 200
+
+
 @bp.route("/create_event", methods=["POST"])
 def create_event():
     if not current_user.is_authenticated:
@@ -89,6 +164,7 @@ def create_event():
         )
         db.session.add(new_event)
         db.session.commit()
+        event_index.upsert(new_event)
 
         return jsonify(
             {"message": "Event created successfully", "event_id": new_event.id}
@@ -105,53 +181,28 @@ def join_event(event_id):
         print("not auth")
         return jsonify({"message": "Not logged in"}), 401
 
-    event = db.session.get(Event, event_id)
-    if not event:
-        return jsonify({"error": "Event not found"}), 404
-
-    is_already_attending = db.session.execute(
-        sa.select(event_attendees).where(
-            event_attendees.c.event_id == event_id,
-            event_attendees.c.user_id == current_user.id,
-        )
-    ).fetchone()
-
-    if is_already_attending:
-        return jsonify({"error": "User is already attending this event"}), 400
-
-    if event.capacity is not None and event.current_registered >= event.capacity:
-        return jsonify({"error": "Event is at full capacity"}), 400
-
     try:
-        stmt = event_attendees.insert().values(
-            event_id=event_id, user_id=current_user.id
-        )
-        db.session.execute(stmt)
-
-        event.current_registered += 1
-        db.session.commit()
-
-        return jsonify({"message": "Successfully joined the event"}), 200
-
+        status = Event.join(event_id, current_user.id)
     except Exception as e:
         db.session.rollback()
         return jsonify({"error": str(e)}), 500
 
+    if status == "not_found":
+        return jsonify({"error": "Event not found"}), 404
+    if status == "already_attending":
+        return jsonify({"error": "User is already attending this event"}), 400
+    if status == "full":
+        return jsonify({"error": "Event is at full capacity"}), 400
+
+    return jsonify({"message": "Successfully joined the event"}), 200
+
 
 @bp.route("/leave_event/<int:event_id>", methods=["POST"])
 def leave_event(event_id):
     if not current_user.is_authenticated:
         return jsonify({"message": "Not logged in"}), 401
 
-    stmt = sa.delete(event_attendees).where(
-        (event_attendees.c.user_id == current_user.id)
-        & (event_attendees.c.event_id == event_id)
-    )
-
-    result = db.session.execute(stmt)
-    db.session.commit()
-
-    if result.rowcount == 0:
+    if not Event.leave(event_id, current_user.id):
         return jsonify({"error": "Not attending this event"}), 400
 
     return jsonify({"message": "Successfully left the event"}), 200
@@ -189,10 +240,20 @@ def edit_event(event_id):
         event.capacity = (
             int(data.get("capacity")) if data.get("capacity") else event.capacity
         )
+        event.updated_at = datetime.now(timezone.utc)
 
         db.session.commit()
+
+        # Reload the committed event together with its creator in one query.
+        event = db.session.scalars(
+            Event.select_with_creator().where(Event.id == event_id)
+        ).one()
+        event_index.upsert(event)
         return jsonify(
-            {"message": "Event updated successfully", "event": event.to_dict()}
+            {
+                "message": "Event updated successfully",
+                "event": Event.serialize_many([event])[0],
+            }
         ), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -213,6 +274,7 @@ def delete_event(event_id):
 
         db.session.delete(event)
         db.session.commit()
+        event_index.remove(event_id)
 
         return jsonify({"message": "Event deleted successfully"}), 200
 
@@ -0,0 +1,154 @@
+import threading
+import time
+from datetime import datetime
+
+import sqlalchemy as sa
+from flask import current_app
+
+from app import db
+from app.models import Event
+from app.main.spatial_index import cell_of, cells_overlapping
+from app.main.utils import haversine_distance
+
+EVENT_CELL_DEGREES = 0.01
+
+
+class EventGrid:
+    """
+    In-memory grid of event locations for "events near me" queries.
+
+    Unlike the incident grid, it is updated in place as events are created,
+    edited and deleted in this process. Changes made by other worker processes
+    are noticed through a marker of the event table (row count, max id and
+    max updated_at), read at most every EVENT_INDEX_POLL_SECONDS; when it
+    moves, the grid is reloaded.
+    """
+
+    def __init__(self, cell_degrees=EVENT_CELL_DEGREES):
+        self.cell_degrees = cell_degrees
+        self._events = None  # id -> (lat, lng, start_time, end_time)
+        self._cells = {}  # cell -> set of event ids
+        self._marker = None
+        self._checked_at = 0.0
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def _read_marker():
+        return tuple(
+            db.session.execute(
+                sa.select(
+                    sa.func.count(Event.id),
+                    sa.func.max(Event.id),
+                    sa.func.max(Event.updated_at),
+                )
+            ).one()
+        )
+
+    def _check_marker(self):
+        """
+        Drop the grid if the event table changed since it was loaded. Our own
+        changes move the marker too, which costs one reload after them.
+        """
+        poll_seconds = current_app.config.get("EVENT_INDEX_POLL_SECONDS", 5.0)
+        now = time.monotonic()
+        if self._events is None or now - self._checked_at < poll_seconds:
+            return
+        self._checked_at = now
+        if self._read_marker() != self._marker:
+            self.invalidate()
+
+    def _ensure_loaded(self):
+        self._check_marker()
+        if self._events is not None:
+            return
+        with self._lock:
+            if self._events is not None:
+                return
+            # Read before the rows, so a change made during the load shows up
+            # as a new marker on the next check.
+            self._marker = self._read_marker()
+            self._checked_at = time.monotonic()
+            self._cells = {}
+            events = {}
+            rows = db.session.execute(
+                sa.select(
+                    Event.id,
+                    Event.latitude,
+                    Event.longitude,
+                    Event.start_time,
+                    Event.end_time,
+                )
+            )
+            for row in rows:
+                events[row.id] = (row.latitude, row.longitude, row.start_time, row.end_time)
+                self._cells.setdefault(
+                    cell_of(row.latitude, row.longitude, self.cell_degrees), set()
+                ).add(row.id)
+            self._events = events
+
+    def upsert(self, event):
+        """
+        Add `event` or move it to its current location and times.
+        """
+        with self._lock:
+            if self._events is None:
+                # Not loaded yet; the first query reads the event from the table.
+                return
+            self._discard(event.id)
+            self._events[event.id] = (
+                event.latitude,
+                event.longitude,
+                event.start_time,
+                event.end_time,
+            )
+            self._cells.setdefault(
+                cell_of(event.latitude, event.longitude, self.cell_degrees), set()
+            ).add(event.id)
+
+    def remove(self, event_id):
+        with self._lock:
+            if self._events is not None:
+                self._discard(event_id)
+
+    def _discard(self, event_id):
+        entry = self._events.pop(event_id, None)
+        if entry is None:
+            return
+        cell = cell_of(entry[0], entry[1], self.cell_degrees)
+        ids = self._cells.get(cell)
+        if ids is not None:
+            ids.discard(event_id)
+            if not ids:
+                del self._cells[cell]
+
+    def nearby(self, lat, lng, radius, now=None):
+        """
+        Return [(event_id, distance)] for events within `radius` miles of
+        (lat, lng) that have not ended yet, nearest first.
+        """
+        if now is None:
+            now = datetime.utcnow()
+        self._ensure_loaded()
+
+        matches = []
+        with self._lock:
+            for cell in cells_overlapping(self._cells, self.cell_degrees, lat, lng, radius):
+                for event_id in self._cells[cell]:
+                    event_lat, event_lng, start_time, end_time = self._events[event_id]
+                    if (end_time or start_time) < now:
+                        continue
+                    distance = haversine_distance(lat, lng, event_lat, event_lng)
+                    if distance <= radius:
+                        matches.append((event_id, distance))
+
+        matches.sort(key=lambda match: (match[1], match[0]))
+        return matches
+
+    def invalidate(self):
+        with self._lock:
+            self._events = None
+            self._cells = {}
+
+
+# Process-wide event grid, loaded lazily on first query.
+event_index = EventGrid()
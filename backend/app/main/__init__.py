@@ -3,3 +3,6 @@ from flask import Blueprint
 bp = Blueprint("main", __name__)
 
 from app.main import routes
+from app.main.refresh import check_for_changes
+
+bp.before_request(check_for_changes)
@@ -0,0 +1,99 @@
+from datetime import datetime, timedelta
+
+import click
+import sqlalchemy as sa
+from flask.cli import with_appcontext
+
+from app import db
+from app.models import Incident, IncidentArchive
+from app.main.utils import SCORING_WINDOW_DAYS
+
+# Columns copied as-is; the incident's id goes to incidents_archive.incident_id.
+ARCHIVE_COLUMNS = ("latitude", "longitude", "severity", "date", "natural_key")
+
+
+def archive_incidents(before=None, batch_size=10000, progress=None):
+    """
+    Move incidents dated before `before` from the incidents table into
+    incidents_archive.
+
+    Rows move oldest first in batches of `batch_size`; each batch is copied and
+    deleted in one transaction, so an interrupted run can simply be started
+    again. Rows whose natural key is already archived are dropped rather than
+    copied twice.
+
+    Args:
+        before: Cutoff datetime (defaults to the 180-day scoring horizon).
+        batch_size: Incidents moved per transaction.
+        progress: Optional callable, given the running total after each batch.
+
+    Returns:
+        int: The number of incidents removed from the incidents table.
+    """
+    if before is None:
+        before = datetime.utcnow() - timedelta(days=SCORING_WINDOW_DAYS)
+
+    incidents = Incident.__table__
+    archive = IncidentArchive.__table__
+    moved = 0
+    while True:
+        ids = db.session.execute(
+            sa.select(incidents.c.id)
+            .where(incidents.c.date < before)
+            .order_by(incidents.c.date)
+            .limit(batch_size)
+        ).scalars().all()
+        if not ids:
+            break
+
+        already_archived = sa.exists().where(
+            archive.c.natural_key == incidents.c.natural_key
+        )
+        db.session.execute(
+            sa.insert(archive).from_select(
+                ["incident_id", *ARCHIVE_COLUMNS, "archived_at"],
+                sa.select(
+                    incidents.c.id,
+                    *(incidents.c[column] for column in ARCHIVE_COLUMNS),
+                    sa.literal(datetime.utcnow(), sa.DateTime),
+                ).where(
+                    incidents.c.id.in_(ids),
+                    sa.or_(incidents.c.natural_key.is_(None), ~already_archived),
+                ),
+            )
+        )
+        db.session.execute(sa.delete(incidents).where(incidents.c.id.in_(ids)))
+        Incident.mark_changed()
+        db.session.commit()
+
+        moved += len(ids)
+        if progress:
+            progress(moved)
+
+    if moved:
+        from app.main.refresh import incidents_changed
+
+        incidents_changed()
+    return moved
+
+
+@click.command("archive-incidents")
+@click.option(
+    "--days",
+    default=SCORING_WINDOW_DAYS,
+    show_default=True,
+    help="Archive incidents older than this many days.",
+)
+@click.option("--batch-size", default=10000, show_default=True)
+@with_appcontext
+def archive_incidents_command(days, batch_size):
+    """
+    Move incidents older than --days into the incidents_archive table.
+    """
+    before = datetime.utcnow() - timedelta(days=days)
+    moved = archive_incidents(
+        before,
+        batch_size=batch_size,
+        progress=lambda total: print(f"Archived {total} incidents so far"),
+    )
+    print(f"Archived {moved} incidents dated before {before:%Y-%m-%d}.")
@@ -0,0 +1,196 @@
+"""
+asyncio pipeline behind /sloc/async: nearby basketball courts with safety
+scores, under a deadline.
+
+/sloc fetches every page of Places results (up to three pages of 20, chained by
+next_page_token) and then scores the courts, one step after the other. Here each
+page is scored as soon as it arrives, while the next one is being fetched. Upstream calls and scoring
+are blocking, so they run on a shared thread pool, at most `concurrency` at a
+time per request, each in its own application context (and so its own database
+session).
+
+When the deadline passes, whatever has been scored so far is returned with
+"incomplete": true, so one slow upstream page (or a next_page_token Google
+doesn't accept in time) can't hold the whole response. Incomplete results are
+not cached.
+"""
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app
+
+from app.main.find_locations import (
+    MAX_PAGES,
+    PAGE_TOKEN_RETRY_SECONDS,
+    PageTokenNotReady,
+    courts_cache,
+    request_courts_page,
+)
+from app.main.scoring import score_points
+
+# Courts per scoring job when the courts come from the cache.
+SCORE_BATCH_SIZE = 20
+
+# Not asyncio's default executor: asyncio.run waits for that one on exit, which
+# would hold a timed-out request until its last upstream call returns.
+_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("SLOC_WORKER_THREADS", 16)),
+    thread_name_prefix="court-pipeline",
+)
+
+
+class CourtPipeline:
+    """
+    One run of the pipeline. Scored courts accumulate on the instance, so a run
+    that is cut off by the deadline still has them.
+    """
+
+    def __init__(self, lat, lng, radius_mi, incident_radius, concurrency):
+        self.lat = lat
+        self.lng = lng
+        self.radius_mi = radius_mi
+        self.incident_radius = incident_radius
+        self.pages = 0
+        self.from_cache = False
+        self.incomplete = False
+        self._scored = {}  # batch number -> scored courts
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._app = current_app._get_current_object()
+
+    def _in_app_context(self, func, args, kwargs):
+        with self._app.app_context():
+            return func(*args, **kwargs)
+
+    async def _blocking(self, func, *args, **kwargs):
+        async with self._semaphore:
+            return await asyncio.get_running_loop().run_in_executor(
+                _executor, self._in_app_context, func, args, kwargs
+            )
+
+    async def _fetch_page(self, center, fetch_radius, page_token, deadline):
+        while True:
+            try:
+                return await self._blocking(
+                    request_courts_page,
+                    center[0],
+                    center[1],
+                    fetch_radius,
+                    page_token=page_token,
+                )
+            except PageTokenNotReady:
+                if time.monotonic() + PAGE_TOKEN_RETRY_SECONDS >= deadline:
+                    raise
+                await asyncio.sleep(PAGE_TOKEN_RETRY_SECONDS)
+
+    async def _score(self, batch, courts):
+        if not courts:
+            self._scored[batch] = []
+            return
+        scores = await self._blocking(
+            score_points,
+            [(court["location"]["lat"], court["location"]["lng"]) for court in courts],
+            self.incident_radius,
+        )
+        self._scored[batch] = [
+            {
+                "name": court["name"],
+                "latitude": court["location"]["lat"],
+                "longitude": court["location"]["lng"],
+                "safety_score": score,
+            }
+            for court, score in zip(courts, scores)
+        ]
+
+    async def _finish(self, jobs, deadline):
+        """
+        Wait for the scoring jobs until the deadline; the ones still running
+        then are cancelled and the result marked incomplete.
+        """
+        if not jobs:
+            return
+        done, pending = await asyncio.wait(
+            jobs, timeout=max(0.0, deadline - time.monotonic())
+        )
+        for job in pending:
+            job.cancel()
+            self.incomplete = True
+        for job in done:
+            job.result()  # re-raise scoring errors
+
+    async def run(self, deadline):
+        """
+        Fetch and score everything, or as much as fits before `deadline` (a
+        time.monotonic() value). Pages are fetched around the cache tile's
+        center with the widened radius (see PlacesTileCache), so a complete
+        result can be cached for the next call from anywhere in the tile.
+
+        Pages that don't arrive in time, including next_page_tokens that still
+        aren't accepted at the deadline, end the fetching and mark the run
+        incomplete; upstream errors are raised.
+        """
+        jobs = []
+        cached = courts_cache.get(self.lat, self.lng, self.radius_mi)
+        if cached is not None:
+            self.from_cache = True
+            for start in range(0, len(cached), SCORE_BATCH_SIZE):
+                jobs.append(
+                    asyncio.create_task(
+                        self._score(len(jobs), cached[start : start + SCORE_BATCH_SIZE])
+                    )
+                )
+            await self._finish(jobs, deadline)
+            return
+
+        center, fetch_radius = courts_cache.fetch_area(self.lat, self.lng, self.radius_mi)
+        fetched = []
+        page_token = None
+        while self.pages < MAX_PAGES:
+            try:
+                page, page_token = await asyncio.wait_for(
+                    self._fetch_page(center, fetch_radius, page_token, deadline),
+                    timeout=max(0.0, deadline - time.monotonic()),
+                )
+            except (PageTokenNotReady, asyncio.TimeoutError):
+                # A page that is still running finishes in the background;
+                # nothing waits on it.
+                self.incomplete = True
+                break
+            self.pages += 1
+            fetched.extend(page)
+            # The fetch covers the whole tile; score only the query's circle.
+            nearby = courts_cache.within(page, self.lat, self.lng, self.radius_mi)
+            jobs.append(asyncio.create_task(self._score(len(jobs), nearby)))
+            if not page_token:
+                break
+
+        if not self.incomplete:
+            courts_cache.put(self.lat, self.lng, self.radius_mi, fetched)
+        await self._finish(jobs, deadline)
+
+    def courts(self):
+        return [court for batch in sorted(self._scored) for court in self._scored[batch]]
+
+
+async def _run_with_deadline(pipeline, timeout):
+    await pipeline.run(time.monotonic() + timeout)
+    return not pipeline.incomplete
+
+
+def courts_with_safety(lat, lng, radius_mi=0.1, incident_radius=0.2, timeout=3.0, concurrency=4):
+    """
+    Run the pipeline to completion or until `timeout` seconds have passed.
+
+    Returns:
+        dict: {"courts": [...], "incomplete": bool, "pages": int,
+        "cached": bool}, with courts in Places order.
+    """
+    pipeline = CourtPipeline(lat, lng, radius_mi, incident_radius, concurrency)
+    complete = asyncio.run(_run_with_deadline(pipeline, timeout))
+    return {
+        "courts": pipeline.courts(),
+        "incomplete": not complete,
+        "pages": pipeline.pages,
+        "cached": pipeline.from_cache,
+    }
@@ -1,38 +1,107 @@
 import os
-import requests
 from dotenv import load_dotenv
 
+from app import metrics
+from app.main import http_client
+from app.main.places_cache import PlacesTileCache
+
 load_dotenv()
 
+# Court locations rarely change, so cached Places results are kept for a week by
+# default (PLACES_CACHE_TTL, seconds).
+courts_cache = PlacesTileCache(
+    tile_degrees=float(os.getenv("PLACES_CACHE_TILE_DEGREES", 0.0025)),
+    ttl=float(os.getenv("PLACES_CACHE_TTL", 7 * 86400)),
+    max_entries=int(os.getenv("PLACES_CACHE_SIZE", 512)),
+)
+
+# Places serves at most three pages (60 results) per search.
+MAX_PAGES = 3
+# How long to wait before retrying a next_page_token Google doesn't accept yet.
+PAGE_TOKEN_RETRY_SECONDS = 0.5
+
 
 def find_basketball_courts(lat, lng, radius_mi: float = 1):
-    radius_meters = radius_mi * 1609
-    print(radius_meters)
     """
     Find basketball courts near a given location within a specified radius (default 1 mile).
+
+    Answered from courts_cache when a cached tile covers the search circle.
+    Otherwise one page is fetched for the whole tile and cached. If the tile
+    has more courts than fit on a page, that page could leave out courts close
+    to the query point, so the query's own circle is searched instead and the
+    result isn't cached; /sloc/async (app.main.court_pipeline) fetches every
+    page and caches such tiles.
+    """
+    courts = courts_cache.get(lat, lng, radius_mi)
+    if courts is not None:
+        return courts
+
+    center, fetch_radius = courts_cache.fetch_area(lat, lng, radius_mi)
+    fetched, next_page_token = request_courts_page(center[0], center[1], fetch_radius)
+    if not next_page_token:
+        return courts_cache.put(lat, lng, radius_mi, fetched)
+    return request_basketball_courts(lat, lng, radius_mi)
+
+
+class PageTokenNotReady(RuntimeError):
+    """
+    Places answered INVALID_REQUEST for a next_page_token. Google only accepts a
+    token a short while after issuing it, so the request can be retried.
     """
+
+
+def _api_key():
     api_key = os.getenv("GOOGLE_NEARBY_API")
     if not api_key:
         raise ValueError("Missing GOOGLE_API_KEY environment variable")
+    return api_key
+
 
-    base_url = "https://maps.googleapis.com/maps/api/place/nearbysearch/json"
-    params = {
-        "location": f"{lat},{lng}",
-        "radius": radius_meters,
-        "keyword": "basketball court",
-        "type": "point_of_interest",
-        "key": api_key,
-    }
+def request_basketball_courts(lat, lng, radius_mi: float = 1):
+    """
+    Uncached Places Nearby Search for basketball courts around a location.
+    Only the first page of results (up to 20 courts) is returned.
+    """
+    courts, _ = request_courts_page(lat, lng, radius_mi)
+    return courts
+
+
+def request_courts_page(lat=None, lng=None, radius_mi: float = 1, page_token=None):
+    """
+    One Places Nearby Search call: the first page for a location, or the page
+    behind `page_token`.
 
-    response = requests.get(base_url, params=params)
+    Returns:
+        tuple: (courts, next_page_token or None).
+
+    Raises:
+        PageTokenNotReady: if `page_token` can't be used yet.
+    """
+    if page_token:
+        params = {"pagetoken": page_token, "key": _api_key()}
+    else:
+        params = {
+            "location": f"{lat},{lng}",
+            "radius": radius_mi * 1609,
+            "keyword": "basketball court",
+            "type": "point_of_interest",
+            "key": _api_key(),
+        }
+
+    base_url = http_client.google_url("/maps/api/place/nearbysearch/json")
+    response = http_client.get(base_url, params=params, name="google.places_nearby")
     if response.status_code != 200:
         raise RuntimeError(f"HTTP error: {response.status_code} - {response.text}")
 
     data = response.json()
     status = data.get("status")
+    metrics.record_upstream_status("google.places_nearby", status)
 
     if status == "ZERO_RESULTS":
-        return []  # No courts found, return an empty list
+        return [], None  # No courts found, return an empty list
+
+    if status == "INVALID_REQUEST" and page_token:
+        raise PageTokenNotReady(page_token)
 
     if status != "OK":
         raise RuntimeError(
@@ -48,4 +117,4 @@ def find_basketball_courts(lat, lng, radius_mi: float = 1):
         for place in data.get("results", [])
     ]
 
-    return courts
+    return courts, data.get("next_page_token")
@@ -0,0 +1,157 @@
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+def normalize_address(address: str) -> str:
+    """
+    Canonical cache key for an address: case-folded, with punctuation runs and
+    whitespace collapsed, so "Center City,  Philadelphia." and
+    "center city, philadelphia" share an entry.
+    """
+    key = address.casefold()
+    key = re.sub(r"[^\w\s,#-]", " ", key)
+    key = re.sub(r"\s*,\s*", ", ", key)
+    key = re.sub(r"\s+", " ", key)
+    return key.strip(" ,")
+
+
+class GeocodeCache:
+    """
+    Two-level cache of geocoding results.
+
+    A bounded in-process LRU sits in front of a SQLite table, so results survive
+    restarts and are shared by every process using the same file. Successful
+    lookups are kept for `ttl` seconds. Addresses the API could not resolve are
+    cached as errors for `negative_ttl` seconds so they are not retried on every
+    request.
+    """
+
+    def __init__(self, path, ttl=30 * 86400, negative_ttl=86400, max_entries=1024):
+        self.path = path
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.negative_hits = 0
+        self._lru = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _db(self):
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False, timeout=5)
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS geocode_cache (
+                    key TEXT PRIMARY KEY,
+                    lat REAL,
+                    lng REAL,
+                    error TEXT,
+                    expires_at REAL NOT NULL
+                )
+                """
+            )
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def _remember(self, key, entry):
+        self._lru[key] = entry
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.max_entries:
+            self._lru.popitem(last=False)
+
+    def get(self, address):
+        """
+        Return the cached entry for `address` as a dict with either a
+        "location" or an "error" key, or None on a miss.
+        """
+        key = normalize_address(address)
+        now = time.time()
+        with self._lock:
+            entry = self._lru.get(key)
+            if entry is not None and entry["expires_at"] <= now:
+                del self._lru[key]
+                entry = None
+
+            if entry is None:
+                row = (
+                    self._db()
+                    .execute(
+                        "SELECT lat, lng, error, expires_at FROM geocode_cache WHERE key = ?",
+                        (key,),
+                    )
+                    .fetchone()
+                )
+                if row is not None and row[3] > now:
+                    lat, lng, error, expires_at = row
+                    entry = {"expires_at": expires_at}
+                    if error is None:
+                        entry["location"] = {"lat": lat, "lng": lng}
+                    else:
+                        entry["error"] = error
+                    self._remember(key, entry)
+            else:
+                self._lru.move_to_end(key)
+
+            if entry is None:
+                self.misses += 1
+                return None
+            if "error" in entry:
+                self.negative_hits += 1
+            else:
+                self.hits += 1
+            return entry
+
+    def _store(self, address, lat, lng, error, ttl):
+        key = normalize_address(address)
+        expires_at = time.time() + ttl
+        entry = {"expires_at": expires_at}
+        if error is None:
+            entry["location"] = {"lat": lat, "lng": lng}
+        else:
+            entry["error"] = error
+
+        with self._lock:
+            conn = self._db()
+            conn.execute(
+                "INSERT OR REPLACE INTO geocode_cache (key, lat, lng, error, expires_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, lat, lng, error, expires_at),
+            )
+            conn.commit()
+            self._remember(key, entry)
+
+    def set(self, address, location):
+        self._store(address, location["lat"], location["lng"], None, self.ttl)
+
+    def set_error(self, address, error):
+        self._store(address, None, None, error, self.negative_ttl)
+
+    def purge_expired(self):
+        """
+        Delete expired rows from the SQLite table.
+        """
+        with self._lock:
+            conn = self._db()
+            conn.execute("DELETE FROM geocode_cache WHERE expires_at <= ?", (time.time(),))
+            conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._lru.clear()
+            conn = self._db()
+            conn.execute("DELETE FROM geocode_cache")
+            conn.commit()
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "negative_hits": self.negative_hits,
+            "misses": self.misses,
+            "lru_entries": len(self._lru),
+        }
@@ -1,33 +1,137 @@
 
 import os
-import requests
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 
-load_dotenv()  # This will 
+from app import metrics
+from app.main import http_client
+from app.main.geocode_cache import GeocodeCache, normalize_address
+
+load_dotenv()  # This will
+
+# API statuses meaning the address itself cannot be resolved; these are cached as
+# failures. Anything else (quota, outages, HTTP errors) is retried next time.
+NEGATIVE_CACHE_STATUSES = {"ZERO_RESULTS", "INVALID_REQUEST"}
+
+# Process-wide cap on Geocoding API calls per second (Google allows 50).
+rate_limiter = http_client.RateLimiter(float(os.environ.get("GEOCODE_RATE_LIMIT", 40)))
+
+MAX_BATCH_WORKERS = int(os.environ.get("GEOCODE_BATCH_WORKERS", 8))
+
+_cache = None
+
+
+def get_geocode_cache() -> GeocodeCache:
+    """
+    Return the process-wide geocoding cache, configured from the environment:
+      - GEOCODE_CACHE_PATH: SQLite file (default: geocode_cache.db next to app.db)
+      - GEOCODE_CACHE_TTL: seconds to keep resolved addresses (default 30 days)
+      - GEOCODE_CACHE_NEGATIVE_TTL: seconds to keep failed lookups (default 1 day)
+      - GEOCODE_CACHE_SIZE: entries kept in the in-process LRU (default 1024)
+    """
+    global _cache
+    if _cache is None:
+        backend_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        _cache = GeocodeCache(
+            os.environ.get("GEOCODE_CACHE_PATH") or os.path.join(backend_dir, "geocode_cache.db"),
+            ttl=float(os.environ.get("GEOCODE_CACHE_TTL", 30 * 86400)),
+            negative_ttl=float(os.environ.get("GEOCODE_CACHE_NEGATIVE_TTL", 86400)),
+            max_entries=int(os.environ.get("GEOCODE_CACHE_SIZE", 1024)),
+        )
+    return _cache
+
 
 def geocode_address(address: str) -> dict:
     """
     Given an address string, use the Google Geocoding API to return its latitude and longitude.
     Returns a dict with keys 'lat' and 'lng'.
+
+    Results (and addresses the API cannot resolve) are cached, see get_geocode_cache.
+    """
+    cache = get_geocode_cache()
+    entry = cache.get(address)
+    if entry is not None:
+        if "error" in entry:
+            raise Exception(entry["error"])
+        return dict(entry["location"])
+
+    try:
+        location = request_geocode(address)
+    except GeocodingStatusError as e:
+        if e.status in NEGATIVE_CACHE_STATUSES:
+            cache.set_error(address, str(e))
+        raise
+
+    cache.set(address, location)
+    return location
+
+
+def geocode_addresses(addresses, max_workers=None) -> list:
+    """
+    Geocode a list of addresses.
+
+    Addresses that normalize to the same cache key are resolved once. Cache
+    misses are resolved concurrently on a bounded thread pool, and every API
+    call goes through the module's rate limiter.
+
+    Returns:
+        list: One dict per input address, in input order, with the address and
+        either a 'location' ({'lat', 'lng'}) or an 'error' message.
+    """
+    unique = {}
+    for address in addresses:
+        unique.setdefault(normalize_address(address), address)
+
+    def resolve(address):
+        try:
+            return {"location": geocode_address(address)}
+        except Exception as e:
+            return {"error": str(e)}
+
+    results = {}
+    if unique:
+        workers = min(max_workers or MAX_BATCH_WORKERS, len(unique))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for key, result in zip(unique, pool.map(resolve, unique.values())):
+                results[key] = result
+
+    return [
+        {"address": address, **results[normalize_address(address)]}
+        for address in addresses
+    ]
+
+
+class GeocodingStatusError(Exception):
+    def __init__(self, status):
+        super().__init__("Geocoding API error: " + status)
+        self.status = status
+
+
+def request_geocode(address: str) -> dict:
+    """
+    Uncached call to the Google Geocoding API.
     """
     api_key = os.environ.get("GOOGLE_API_KEY")
     if not api_key:
         raise Exception("Missing GOOGLE_API_KEY environment variable")
-    
-    base_url = "https://maps.googleapis.com/maps/api/geocode/json"
+
+    rate_limiter.acquire()
+
+    base_url = http_client.google_url("/maps/api/geocode/json")
     params = {
         "address": address,
         "key": api_key
     }
-    
-    response = requests.get(base_url, params=params)
+
+    response = http_client.get(base_url, params=params, name="google.geocode")
     if response.status_code != 200:
         raise Exception("Error in geocoding request")
-    
+
     data = response.json()
+    metrics.record_upstream_status("google.geocode", data.get("status"))
     if data.get("status") != "OK":
-        raise Exception("Geocoding API error: " + data.get("status", "Unknown error"))
-    
+        raise GeocodingStatusError(data.get("status", "Unknown error"))
+
     # Use the first result from the API
     location = data["results"][0]["geometry"]["location"]
     return location
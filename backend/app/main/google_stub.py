@@ -0,0 +1,150 @@
+"""
+Local stand-in for the Google Geocoding and Places Nearby Search APIs.
+
+Run it with `python -m app.main.google_stub [port]` and set
+GOOGLE_MAPS_BASE_URL=http://127.0.0.1:<port> (plus any GOOGLE_API_KEY /
+GOOGLE_NEARBY_API value) to exercise geocoding and court search without network
+access. Responses are deterministic for a given request.
+"""
+import hashlib
+import json
+import math
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+# Philadelphia bounding box used for fake geocoding results.
+MIN_LAT, MAX_LAT = 39.87, 40.13
+MIN_LNG, MAX_LNG = -75.27, -74.96
+
+PAGE_SIZE = 20
+
+
+def _unit(text, salt):
+    digest = hashlib.sha1(f"{salt}:{text}".encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") / 2**64
+
+
+def fake_geocode(address):
+    """
+    Map an address to a stable point in Philadelphia. Addresses containing
+    "nowhere" do not resolve.
+    """
+    if not address.strip():
+        return {"status": "INVALID_REQUEST", "results": []}
+    if "nowhere" in address.lower():
+        return {"status": "ZERO_RESULTS", "results": []}
+
+    key = " ".join(address.lower().split())
+    location = {
+        "lat": MIN_LAT + (MAX_LAT - MIN_LAT) * _unit(key, "lat"),
+        "lng": MIN_LNG + (MAX_LNG - MIN_LNG) * _unit(key, "lng"),
+    }
+    return {
+        "status": "OK",
+        "results": [{"formatted_address": address, "geometry": {"location": location}}],
+    }
+
+
+def fake_courts(lat, lng, radius_m, courts_per_query):
+    """
+    Deterministic courts spread evenly within the search radius.
+    """
+    radius_deg = radius_m / 1609 / 69.0
+    places = []
+    for i in range(courts_per_query):
+        angle = 2 * math.pi * _unit(f"{lat:.5f},{lng:.5f}:{i}", "angle")
+        dist = radius_deg * math.sqrt(_unit(f"{lat:.5f},{lng:.5f}:{i}", "dist"))
+        places.append(
+            {
+                "name": f"Stub Court {i + 1}",
+                "vicinity": f"{100 + i} Stub St, Philadelphia",
+                "geometry": {
+                    "location": {
+                        "lat": lat + dist * math.sin(angle),
+                        "lng": lng + dist * math.cos(angle) / math.cos(math.radians(lat)),
+                    }
+                },
+            }
+        )
+    return places
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    # Overridden per server by start_stub_server.
+    courts_per_query = 25
+    delay = 0.0
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = {k: v[0] for k, v in parse_qs(url.query).items()}
+        if self.delay:
+            time.sleep(self.delay)
+
+        if "key" not in params:
+            body = {"status": "REQUEST_DENIED", "error_message": "Missing key"}
+        elif url.path == "/maps/api/geocode/json":
+            body = fake_geocode(params.get("address", ""))
+        elif url.path == "/maps/api/place/nearbysearch/json":
+            body = self._nearby(params)
+        else:
+            self.send_error(404)
+            return
+
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _nearby(self, params):
+        if "pagetoken" in params:
+            try:
+                query, offset = params["pagetoken"].rsplit("|", 1)
+                lat, lng, radius = (float(v) for v in query.split(","))
+                offset = int(offset)
+            except ValueError:
+                return {"status": "INVALID_REQUEST", "results": []}
+        else:
+            lat, lng = (float(v) for v in params["location"].split(","))
+            radius = float(params.get("radius", 1609))
+            offset = 0
+
+        places = fake_courts(lat, lng, radius, self.courts_per_query)
+        if not places:
+            return {"status": "ZERO_RESULTS", "results": []}
+
+        body = {"status": "OK", "results": places[offset : offset + PAGE_SIZE]}
+        if offset + PAGE_SIZE < len(places):
+            body["next_page_token"] = f"{lat},{lng},{radius}|{offset + PAGE_SIZE}"
+        return body
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_stub_server(port=0, courts_per_query=25, delay=0.0):
+    """
+    Start the stub on 127.0.0.1 in a daemon thread.
+
+    Returns:
+        tuple: (server, base_url); call server.shutdown() to stop it.
+    """
+    handler = type(
+        "ConfiguredStubHandler",
+        (StubHandler,),
+        {"courts_per_query": courts_per_query, "delay": delay},
+    )
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+if __name__ == "__main__":
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8765
+    server = ThreadingHTTPServer(("127.0.0.1", port), StubHandler)
+    print(f"Google API stub listening on http://127.0.0.1:{port}")
+    server.serve_forever()
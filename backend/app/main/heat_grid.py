@@ -0,0 +1,246 @@
+import math
+import threading
+from datetime import datetime
+
+import numpy as np
+from flask import current_app
+
+from app.main.scoring import score_points
+from app.main.spatial_index import bounding_box, incident_index
+
+# Philadelphia city limits, padded slightly.
+PHILLY_BOUNDS = (39.86, 40.14, -75.29, -74.95)  # min_lat, max_lat, min_lng, max_lng
+
+DEFAULT_CELL_DEGREES = 0.005  # about 0.35 miles north/south
+DEFAULT_RADIUS = 0.2  # same incident radius /sloc uses
+DEFAULT_TILE_CELLS = 32
+
+
+class SafetyHeatGrid:
+    """
+    Precomputed raster of safety scores over the Philadelphia bounding box.
+
+    Each cell holds the calculate_safety_score value (1 = safest, 10 = most
+    dangerous) at the cell's center, so a lookup is a single array index. The
+    raster is built from the incident grid, refreshed around newly imported
+    incidents, and rebuilt in the background once a day so the 30-day recency
+    decay stays current.
+
+    `scores` and `built_at` are only read and replaced under `_lock`; readers
+    take both at once (see _raster) so a concurrent invalidate() can't pull the
+    raster out from under them.
+    """
+
+    def __init__(self, bounds=PHILLY_BOUNDS):
+        self.min_lat, self.max_lat, self.min_lng, self.max_lng = bounds
+        self.cell_degrees = None
+        self.radius = None
+        self.tile_cells = None
+        self.scores = None
+        self.built_at = None
+        self._lock = threading.Lock()
+        # Serializes first builds, which run without holding _lock.
+        self._build_lock = threading.Lock()
+        # Bumped by invalidate(), so a build that started before it is dropped.
+        self._generation = 0
+        self._rebuilding = False
+
+    @property
+    def shape(self):
+        return (
+            math.ceil((self.max_lat - self.min_lat) / self.cell_degrees),
+            math.ceil((self.max_lng - self.min_lng) / self.cell_degrees),
+        )
+
+    def configure(self, config):
+        self.cell_degrees = config.get("SAFETY_GRID_CELL_DEGREES", DEFAULT_CELL_DEGREES)
+        self.radius = config.get("SAFETY_GRID_RADIUS", DEFAULT_RADIUS)
+        self.tile_cells = config.get("SAFETY_GRID_TILE_CELLS", DEFAULT_TILE_CELLS)
+
+    def cell_index(self, lat, lng):
+        """
+        Return the (row, col) of the cell containing (lat, lng), or None if the
+        point is outside the raster.
+        """
+        rows, cols = self.shape
+        row = math.floor((lat - self.min_lat) / self.cell_degrees)
+        col = math.floor((lng - self.min_lng) / self.cell_degrees)
+        if 0 <= row < rows and 0 <= col < cols:
+            return row, col
+        return None
+
+    def cell_center(self, row, col):
+        return (
+            self.min_lat + (row + 0.5) * self.cell_degrees,
+            self.min_lng + (col + 0.5) * self.cell_degrees,
+        )
+
+    def _score_cells(self, cells, now):
+        return score_points(
+            [self.cell_center(row, col) for row, col in cells], self.radius, now=now
+        )
+
+    def build(self):
+        """
+        Score every cell. Must be called inside an application context.
+
+        Returns:
+            tuple: (scores, built_at) of the new raster. It is installed unless
+            invalidate() was called while it was being built.
+        """
+        if self.cell_degrees is None:
+            self.configure(current_app.config)
+
+        with self._lock:
+            generation = self._generation
+        now = datetime.utcnow()
+        rows, cols = self.shape
+        scores = np.ones((rows, cols), dtype=np.float64)
+        # One raster row at a time keeps each batch's incident set small.
+        for row in range(rows):
+            scores[row, :] = self._score_cells([(row, col) for col in range(cols)], now)
+
+        with self._lock:
+            if generation == self._generation:
+                self.scores = scores
+                self.built_at = now
+        return scores, now
+
+    def _current(self):
+        with self._lock:
+            return self.scores, self.built_at
+
+    def _raster(self):
+        """
+        Return (scores, built_at), building the raster on first use, and start a
+        background rebuild when it was computed on an earlier (UTC) day.
+        """
+        scores, built_at = self._current()
+        if scores is None:
+            with self._build_lock:
+                scores, built_at = self._current()
+                if scores is None:
+                    scores, built_at = self.build()
+        elif built_at.date() < datetime.utcnow().date():
+            self._rebuild_in_background()
+        return scores, built_at
+
+    def _rebuild_in_background(self):
+        with self._lock:
+            if self._rebuilding:
+                return
+            self._rebuilding = True
+
+        app = current_app._get_current_object()
+
+        def rebuild():
+            try:
+                with app.app_context():
+                    self.build()
+            finally:
+                self._rebuilding = False
+
+        threading.Thread(target=rebuild, daemon=True).start()
+
+    def invalidate(self):
+        """
+        Drop the raster; the next lookup rebuilds it.
+        """
+        with self._lock:
+            self._generation += 1
+            self.scores = None
+            self.built_at = None
+
+    def refresh_around(self, points):
+        """
+        Re-score only the cells whose score can be affected by incidents at the
+        given (lat, lng) points. Does nothing if the raster was never built, and
+        drops it (to be rebuilt on next use) when most cells are affected.
+        """
+        scores, built_at = self._current()
+        if scores is None:
+            return
+
+        rows, cols = self.shape
+        affected = set()
+        for lat, lng in points:
+            min_lat, max_lat, min_lng, max_lng = bounding_box(lat, lng, self.radius)
+            min_row = max(0, math.floor((min_lat - self.min_lat) / self.cell_degrees))
+            max_row = min(rows - 1, math.floor((max_lat - self.min_lat) / self.cell_degrees))
+            min_col = max(0, math.floor((min_lng - self.min_lng) / self.cell_degrees))
+            max_col = min(cols - 1, math.floor((max_lng - self.min_lng) / self.cell_degrees))
+            for row in range(min_row, max_row + 1):
+                for col in range(min_col, max_col + 1):
+                    affected.add((row, col))
+
+        if len(affected) > rows * cols // 2:
+            self.invalidate()
+            return
+
+        # Score with the raster's own reference time so refreshed cells decay
+        # consistently with their neighbours until the next daily rebuild.
+        affected = sorted(affected)
+        new_scores = self._score_cells(affected, built_at)
+        with self._lock:
+            # Whatever raster is current now (possibly rebuilt meanwhile) gets
+            # the new incidents; a dropped one is rebuilt with them anyway.
+            if self.scores is None:
+                return
+            for (row, col), score in zip(affected, new_scores):
+                self.scores[row, col] = score
+
+    def lookup(self, lat, lng):
+        """
+        Return the precomputed score for the cell containing (lat, lng), or None
+        if the point is outside the raster.
+        """
+        scores, _ = self._raster()
+        index = self.cell_index(lat, lng)
+        if index is None:
+            return None
+        return float(scores[index])
+
+    def tile(self, tile_row, tile_col):
+        """
+        Return one tile of `tile_cells` x `tile_cells` scores, or None if the tile
+        is outside the raster.
+        """
+        scores, _ = self._raster()
+        rows, cols = self.shape
+        row0 = tile_row * self.tile_cells
+        col0 = tile_col * self.tile_cells
+        if tile_row < 0 or tile_col < 0 or row0 >= rows or col0 >= cols:
+            return None
+
+        block = scores[row0 : row0 + self.tile_cells, col0 : col0 + self.tile_cells]
+        return {
+            "tile": [tile_row, tile_col],
+            "min_lat": self.min_lat + row0 * self.cell_degrees,
+            "min_lng": self.min_lng + col0 * self.cell_degrees,
+            "cell_degrees": self.cell_degrees,
+            "scores": block.round(2).tolist(),
+        }
+
+    def describe(self):
+        _, built_at = self._raster()
+        rows, cols = self.shape
+        return {
+            "bounds": {
+                "min_lat": self.min_lat,
+                "max_lat": self.max_lat,
+                "min_lng": self.min_lng,
+                "max_lng": self.max_lng,
+            },
+            "cell_degrees": self.cell_degrees,
+            "radius": self.radius,
+            "shape": [rows, cols],
+            "tile_cells": self.tile_cells,
+            "tiles": [math.ceil(rows / self.tile_cells), math.ceil(cols / self.tile_cells)],
+            "built_at": built_at.isoformat(),
+        }
+
+
+# Process-wide raster, built lazily on first use.
+safety_grid = SafetyHeatGrid()
+# Another worker imported incidents; rebuild from the new shared snapshot.
+incident_index.swap_listeners.append(safety_grid.invalidate)
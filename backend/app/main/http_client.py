@@ -0,0 +1,108 @@
+import os
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from app import metrics
+
+CONNECT_TIMEOUT = float(os.environ.get("HTTP_CONNECT_TIMEOUT", 3.05))
+READ_TIMEOUT = float(os.environ.get("HTTP_READ_TIMEOUT", 10))
+MAX_RETRIES = int(os.environ.get("HTTP_MAX_RETRIES", 2))
+POOL_SIZE = int(os.environ.get("HTTP_POOL_SIZE", 20))
+
+
+def google_url(path):
+    """
+    Absolute URL of a Google Maps web service path. Set GOOGLE_MAPS_BASE_URL to
+    a local stub server (see app.main.google_stub) to exercise the full request
+    path offline.
+    """
+    base_url = os.environ.get("GOOGLE_MAPS_BASE_URL", "https://maps.googleapis.com")
+    return base_url.rstrip("/") + path
+
+
+class RateLimiter:
+    """
+    Thread-safe token bucket: at most `rate` calls per second on average, with
+    bursts of up to `burst` calls.
+    """
+
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.burst = float(burst or rate)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """
+        Block until a call is allowed.
+        """
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(
+                    self.burst, self._tokens + (now - self._updated) * self.rate
+                )
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """
+    Return the shared requests.Session. Its connection pool keeps connections to
+    Google alive between calls, and idempotent requests are retried with
+    exponential backoff on connection errors and 5xx responses.
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                retry = Retry(
+                    total=MAX_RETRIES,
+                    backoff_factor=0.3,
+                    status_forcelist=(500, 502, 503, 504),
+                    allowed_methods=frozenset({"GET"}),
+                    raise_on_status=False,
+                )
+                adapter = HTTPAdapter(
+                    pool_connections=4, pool_maxsize=POOL_SIZE, max_retries=retry
+                )
+                session = requests.Session()
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _session = session
+    return _session
+
+
+def get(url, params=None, name=None, timeout=None):
+    """
+    GET `url` through the shared session with connect/read timeouts, recording
+    the call's latency in app.metrics under `name` (defaults to the URL).
+    """
+    name = name or url
+    start = time.perf_counter()
+    try:
+        response = get_session().get(
+            url, params=params, timeout=timeout or (CONNECT_TIMEOUT, READ_TIMEOUT)
+        )
+    except requests.RequestException:
+        elapsed = time.perf_counter() - start
+        metrics.record_upstream(name, elapsed, error=True)
+        raise
+
+    elapsed = time.perf_counter() - start
+    error = response.status_code >= 400
+    metrics.record_upstream(name, elapsed, error=error)
+    return response
@@ -1,7 +1,22 @@
 from app.models import Incident
-def populateIncidents():
+
+
+def printProgress(report):
+    print(f"Imported {report['imported']} incidents so far "
+          f"({report['rows_read']} rows read, {report['rejected']} rejected)")
+
+
+def populateIncidents(resume_from=0, incremental=True):
     print("hi")
     file_path = 'app/main/cleaned_data.csv'
     with open(file_path, 'rb') as f:
-        count = Incident.import_from_csv(f)
-        print(f"Imported {count} incidents.")
+        # Incremental imports skip rows well before the newest one imported from
+        # this file last time; either way, rows already in the table are skipped.
+        report = Incident.import_from_csv_stream(
+            f,
+            resume_from=resume_from,
+            progress=printProgress,
+            source='cleaned_data.csv' if incremental else None,
+        )
+        print(f"Imported {report['imported']} incidents.")
+    return report
@@ -0,0 +1,85 @@
+import sqlalchemy as sa
+from flask import current_app
+
+from app import db
+from app.models import Incident
+from app.main.spatial_index import bounding_box, incident_index
+from app.main.utils import haversine_distance
+
+INCIDENT_COLUMNS = (
+    Incident.id,
+    Incident.latitude,
+    Incident.longitude,
+    Incident.severity,
+    Incident.date,
+)
+
+
+def index_enabled():
+    """
+    Whether radius queries should use the in-memory incident grid.
+    """
+    return current_app.config.get("INCIDENT_INDEX_ENABLED", True)
+
+
+def bounding_box_clause(lat, lng, radius, since=None):
+    """
+    Build a WHERE clause selecting the incidents inside the bounding box of the
+    circle of `radius` miles around (lat, lng), optionally limited to incidents
+    on or after `since`. It can use the (latitude, longitude) and date indexes;
+    callers still need the haversine check to drop the box's corners.
+    """
+    min_lat, max_lat, min_lng, max_lng = bounding_box(lat, lng, radius)
+    clauses = [
+        Incident.latitude.between(min_lat, max_lat),
+        Incident.longitude.between(min_lng, max_lng),
+    ]
+    if since is not None:
+        clauses.append(Incident.date >= since)
+    return sa.and_(*clauses)
+
+
+def candidates_statement(points, radius, since=None):
+    """
+    SELECT for the incidents inside the bounding box of any of the (lat, lng)
+    points.
+    """
+    where = sa.or_(
+        *(bounding_box_clause(lat, lng, radius, since) for lat, lng in points)
+    )
+    return sa.select(*INCIDENT_COLUMNS).where(where)
+
+
+def select_candidates(points, radius, since=None):
+    """
+    Load the incidents inside the bounding box of any of the (lat, lng) points.
+    """
+    points = list(points)
+    if not points:
+        return []
+    return db.session.execute(candidates_statement(points, radius, since)).all()
+
+
+def incidents_within_sql(lat, lng, radius, since=None):
+    """
+    Yield (incident, distance) for the incidents within `radius` miles of
+    (lat, lng), letting the database prune rows with a bounding box first.
+    Rows are fetched in chunks rather than all at once.
+    """
+    stmt = candidates_statement([(lat, lng)], radius, since)
+    rows = db.session.execute(stmt.execution_options(yield_per=1000))
+    for row in rows:
+        distance = haversine_distance(lat, lng, row.latitude, row.longitude)
+        if distance <= radius:
+            yield row, distance
+
+
+def incidents_within(lat, lng, radius, since=None):
+    """
+    Yield (incident, distance) for the incidents within `radius` miles of
+    (lat, lng), from the in-memory grid when it is enabled and from the
+    database otherwise.
+    """
+    if index_enabled():
+        return incident_index.within(lat, lng, radius, since)
+    return incidents_within_sql(lat, lng, radius, since)
@@ -0,0 +1,164 @@
+"""
+Versioned, memory-mapped snapshot files of the incident grid.
+
+With several worker processes, each one would otherwise read the incidents table
+and hold its own copy of the grid. Instead, whoever changes the incidents writes
+the grid out once as a directory of .npy column files:
+
+    <directory>/
+        CURRENT                     name of the newest complete version
+        v<timestamp>-<pid>/
+            manifest.json
+            ids.npy latitudes.npy longitudes.npy severities.npy days.npy seconds.npy
+            cell_rows.npy cell_cols.npy cell_starts.npy cell_stops.npy
+
+and every worker maps the files read-only (np.load(..., mmap_mode="r")), so the
+operating system keeps one physical copy in its page cache for all of them.
+Version directories are written under a temporary name and renamed into place
+before CURRENT is switched, so readers never see a partial snapshot.
+"""
+import hashlib
+import json
+import os
+import shutil
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+from app.main.incident_store import IncidentStore
+
+FORMAT_VERSION = 1
+CURRENT_FILE = "CURRENT"
+MANIFEST_FILE = "manifest.json"
+COLUMNS = ("ids", "latitudes", "longitudes", "severities", "days", "seconds")
+CELL_COLUMNS = ("cell_rows", "cell_cols", "cell_starts", "cell_stops")
+
+
+class SnapshotMismatch(Exception):
+    """
+    The snapshot on disk was written for another database or grid layout.
+    """
+
+
+def source_id(database_uri):
+    """
+    Short fingerprint of the database a snapshot was built from.
+    """
+    return hashlib.sha1(database_uri.encode("utf-8")).hexdigest()[:16]
+
+
+def current_version(directory):
+    """
+    Name of the newest complete snapshot in `directory`, or None.
+    """
+    try:
+        with open(os.path.join(directory, CURRENT_FILE)) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def write_snapshot(directory, store, cells, cell_degrees, source, keep=3):
+    """
+    Write a grid (a cell-sorted IncidentStore and its cell -> (start, stop)
+    mapping) as a new version and make it current. Older versions beyond the
+    newest `keep` are removed; processes still mapping them keep working, as the
+    files stay alive until they are unmapped.
+
+    Returns:
+        str: The new version's name.
+    """
+    os.makedirs(directory, exist_ok=True)
+    version = f"v{time.time_ns()}-{os.getpid()}"
+    staging = os.path.join(directory, f".{version}.tmp")
+    os.makedirs(staging)
+
+    for name in COLUMNS:
+        np.save(os.path.join(staging, f"{name}.npy"), getattr(store, name))
+
+    keys = sorted(cells)
+    cell_columns = {
+        "cell_rows": [row for row, _ in keys],
+        "cell_cols": [col for _, col in keys],
+        "cell_starts": [cells[key][0] for key in keys],
+        "cell_stops": [cells[key][1] for key in keys],
+    }
+    for name, values in cell_columns.items():
+        np.save(os.path.join(staging, f"{name}.npy"), np.asarray(values, dtype=np.int64))
+
+    manifest = {
+        "format": FORMAT_VERSION,
+        "version": version,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "count": len(store),
+        "cells": len(keys),
+        "cell_degrees": cell_degrees,
+        "source": source,
+    }
+    with open(os.path.join(staging, MANIFEST_FILE), "w") as f:
+        json.dump(manifest, f)
+
+    os.rename(staging, os.path.join(directory, version))
+    pointer = os.path.join(directory, f".{CURRENT_FILE}.{version}.tmp")
+    with open(pointer, "w") as f:
+        f.write(version)
+    os.replace(pointer, os.path.join(directory, CURRENT_FILE))
+
+    prune(directory, keep)
+    return version
+
+
+def open_snapshot(directory, version, cell_degrees, source):
+    """
+    Map a snapshot version read-only.
+
+    Returns:
+        tuple: (IncidentStore backed by the mapped files, cells dict).
+
+    Raises:
+        SnapshotMismatch: if it was built for another database or cell size.
+        FileNotFoundError: if the version has been pruned in the meantime.
+    """
+    path = os.path.join(directory, version)
+    with open(os.path.join(path, MANIFEST_FILE)) as f:
+        manifest = json.load(f)
+    if (
+        manifest.get("format") != FORMAT_VERSION
+        or manifest.get("source") != source
+        or manifest.get("cell_degrees") != cell_degrees
+    ):
+        raise SnapshotMismatch(version)
+
+    load = lambda name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r")
+    store = IncidentStore(*(load(name) for name in COLUMNS))
+    rows, cols, starts, stops = (load(name).tolist() for name in CELL_COLUMNS)
+    cells = {
+        (row, col): (start, stop)
+        for row, col, start, stop in zip(rows, cols, starts, stops)
+    }
+    return store, cells
+
+
+def prune(directory, keep):
+    """
+    Remove all but the newest `keep` versions (never the current one), plus
+    leftovers of interrupted writes.
+    """
+    current = current_version(directory)
+    versions = sorted(
+        (name for name in os.listdir(directory) if name.startswith("v")),
+        key=lambda name: int(name[1:].split("-")[0]),
+    )
+    for name in versions[:-keep] if keep else versions:
+        if name != current:
+            shutil.rmtree(os.path.join(directory, name), ignore_errors=True)
+    for name in os.listdir(directory):
+        if name.startswith(".") and name.endswith(".tmp"):
+            path = os.path.join(directory, name)
+            # Only clear stale leftovers, not another process's write in flight.
+            if time.time() - os.path.getmtime(path) > 3600:
+                if os.path.isdir(path):
+                    shutil.rmtree(path, ignore_errors=True)
+                else:
+                    os.remove(path)
@@ -0,0 +1,221 @@
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+import numpy as np
+import sqlalchemy as sa
+
+from app import db
+from app.models import Incident
+from app.main.utils import haversine_many
+
+SECONDS_PER_DAY = 86400
+EPOCH = datetime(1970, 1, 1)
+
+# Rows fetched per round trip while loading, so the full result set is never
+# held as Row objects at once.
+LOAD_CHUNK_SIZE = 50000
+
+# What the store hands back for a single incident. It has the same attributes
+# the routes read from Incident (id, latitude, longitude, severity, date).
+IncidentRecord = namedtuple(
+    "IncidentRecord", ["id", "latitude", "longitude", "severity", "date"]
+)
+
+
+def _to_epoch_seconds(dates):
+    return np.asarray(dates, dtype="datetime64[s]").astype(np.int64)
+
+
+def _epoch_seconds_ceil(moment):
+    elapsed = moment - EPOCH
+    return elapsed.days * SECONDS_PER_DAY + elapsed.seconds + (elapsed.microseconds > 0)
+
+
+class IncidentStore:
+    """
+    Read-only, column-oriented copy of the incidents needed for scoring.
+
+    Incidents are held as parallel typed arrays instead of ORM objects:
+      - ids: int64
+      - latitudes, longitudes: float64
+      - severities: int8
+      - days: int64 days since 1970-01-01 (UTC)
+      - seconds: int32 seconds into that day, so dates that carry a time of day
+        round-trip exactly
+
+    That is about 37 bytes per incident, against the best part of a kilobyte
+    for an Incident instance with its identity-map and instance state. A store
+    is never modified after it is built; reloading means building a new one and
+    swapping the reference.
+    """
+
+    def __init__(self, ids, latitudes, longitudes, severities, days, seconds):
+        self.ids = np.asarray(ids, dtype=np.int64)
+        self.latitudes = np.asarray(latitudes, dtype=np.float64)
+        self.longitudes = np.asarray(longitudes, dtype=np.float64)
+        self.severities = np.asarray(severities, dtype=np.int8)
+        self.days = np.asarray(days, dtype=np.int64)
+        self.seconds = np.asarray(seconds, dtype=np.int32)
+
+    @classmethod
+    def empty(cls):
+        return cls([], [], [], [], [], [])
+
+    @classmethod
+    def from_columns(cls, ids, latitudes, longitudes, severities, dates):
+        """
+        Build a store from column sequences, `dates` being datetimes.
+        """
+        timestamps = _to_epoch_seconds(dates)
+        severities = np.clip(np.asarray(severities, dtype=np.int64), -128, 127)
+        return cls(
+            ids,
+            latitudes,
+            longitudes,
+            severities,
+            timestamps // SECONDS_PER_DAY,
+            timestamps % SECONDS_PER_DAY,
+        )
+
+    @classmethod
+    def from_incidents(cls, incidents):
+        """
+        Build a store from Incident objects, Core rows or IncidentRecords.
+        """
+        incidents = list(incidents)
+        return cls.from_columns(
+            [i.id for i in incidents],
+            [i.latitude for i in incidents],
+            [i.longitude for i in incidents],
+            [i.severity for i in incidents],
+            [i.date for i in incidents],
+        )
+
+    @classmethod
+    def load(cls, where=None, chunk_size=LOAD_CHUNK_SIZE):
+        """
+        Load the incidents table (optionally filtered by `where`) with a Core
+        select. Must be called inside an application context.
+        """
+        stmt = sa.select(
+            Incident.id,
+            Incident.latitude,
+            Incident.longitude,
+            Incident.severity,
+            Incident.date,
+        ).order_by(Incident.id)
+        if where is not None:
+            stmt = stmt.where(where)
+
+        chunks = []
+        result = db.session.execute(stmt.execution_options(yield_per=chunk_size))
+        for rows in result.partitions():
+            chunks.append(cls.from_columns(*zip(*rows)))
+        return cls.concatenate(chunks)
+
+    @classmethod
+    def concatenate(cls, stores):
+        stores = list(stores)
+        if not stores:
+            return cls.empty()
+        return cls(
+            *(
+                np.concatenate([getattr(store, name) for store in stores])
+                for name in ("ids", "latitudes", "longitudes", "severities", "days", "seconds")
+            )
+        )
+
+    def __len__(self):
+        return self.ids.size
+
+    @property
+    def nbytes(self):
+        return sum(
+            array.nbytes
+            for array in (
+                self.ids,
+                self.latitudes,
+                self.longitudes,
+                self.severities,
+                self.days,
+                self.seconds,
+            )
+        )
+
+    @property
+    def dates(self):
+        """
+        Incident dates as a datetime64[s] array.
+        """
+        timestamps = self.days * SECONDS_PER_DAY + self.seconds
+        return timestamps.astype("datetime64[s]")
+
+    def take(self, indices):
+        """
+        New store holding the incidents at `indices` (an index array or mask).
+        """
+        return IncidentStore(
+            self.ids[indices],
+            self.latitudes[indices],
+            self.longitudes[indices],
+            self.severities[indices],
+            self.days[indices],
+            self.seconds[indices],
+        )
+
+    def arrays(self):
+        """
+        (latitudes, longitudes, severities, dates) in the form the kernels in
+        app.main.utils expect, like utils.incident_arrays.
+        """
+        return self.latitudes, self.longitudes, self.severities, self.dates
+
+    def record(self, index):
+        return IncidentRecord(
+            int(self.ids[index]),
+            float(self.latitudes[index]),
+            float(self.longitudes[index]),
+            int(self.severities[index]),
+            EPOCH
+            + timedelta(days=int(self.days[index]), seconds=int(self.seconds[index])),
+        )
+
+    def first_since(self, since, start=0, stop=None):
+        """
+        Position of the first incident dated on or after `since` in
+        [start, stop), which must be sorted by date. A binary search, so
+        selecting a time window does not touch the older incidents at all.
+        """
+        if stop is None:
+            stop = len(self)
+        day, second = divmod(_epoch_seconds_ceil(since), SECONDS_PER_DAY)
+        days = self.days[start:stop]
+        lo = start + int(np.searchsorted(days, day, "left"))
+        hi = start + int(np.searchsorted(days, day, "right"))
+        return lo + int(np.searchsorted(self.seconds[lo:hi], second, "left"))
+
+    def match(self, lat, lng, radius, since=None):
+        """
+        Indices and distances of the incidents within `radius` miles of
+        (lat, lng), skipping incidents older than `since` if it is given.
+
+        Returns:
+            tuple: (indices int64 array, distances float64 array), in store order.
+        """
+        indices = np.arange(len(self))
+        if since is not None:
+            indices = indices[self.dates >= np.datetime64(since, "us")]
+        distances = haversine_many(
+            lat, lng, self.latitudes[indices], self.longitudes[indices]
+        )
+        inside = distances <= radius
+        return indices[inside], distances[inside]
+
+    def within(self, lat, lng, radius, since=None):
+        """
+        Yield (IncidentRecord, distance) for the incidents within `radius` miles
+        of (lat, lng), like incident_queries.incidents_within.
+        """
+        indices, distances = self.match(lat, lng, radius, since)
+        for index, distance in zip(indices.tolist(), distances.tolist()):
+            yield self.record(index), distance
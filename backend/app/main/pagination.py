@@ -0,0 +1,38 @@
+import base64
+import binascii
+import json
+
+DEFAULT_PAGE_SIZE = 25
+MAX_PAGE_SIZE = 100
+
+
+def encode_cursor(values: dict) -> str:
+    """
+    Encode keyset position values as an opaque, URL-safe continuation token.
+    """
+    raw = json.dumps(values, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token: str) -> dict:
+    """
+    Decode a token made by encode_cursor. Raises ValueError if it is malformed.
+    """
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (binascii.Error, UnicodeError, json.JSONDecodeError) as e:
+        raise ValueError("Invalid cursor") from e
+    if not isinstance(values, dict):
+        raise ValueError("Invalid cursor")
+    return values
+
+
+def page_size(requested, default=DEFAULT_PAGE_SIZE, maximum=MAX_PAGE_SIZE) -> int:
+    """
+    Clamp a client-requested page size to [1, maximum]. Raises ValueError if it
+    is not an integer.
+    """
+    if requested is None:
+        return default
+    return max(1, min(maximum, int(requested)))
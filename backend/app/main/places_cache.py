@@ -0,0 +1,156 @@
+import math
+import threading
+import time
+from collections import OrderedDict
+
+from app.main.utils import haversine_distance
+
+
+class PlacesTileCache:
+    """
+    Cache of Places Nearby Search results keyed by a snapped geographic tile.
+
+    A miss fetches once from the center of the tile containing the query, with
+    the radius widened by the tile's half-diagonal. That circle contains the
+    query circle of every point in the tile, so later queries from anywhere in
+    the tile (or from a neighbouring tile whose cached circle still covers
+    them) are answered by filtering the cached results by distance. Entries
+    expire after `ttl` seconds and the least recently used are evicted beyond
+    `max_entries`.
+    """
+
+    def __init__(self, tile_degrees=0.0025, ttl=7 * 86400, max_entries=512):
+        self.tile_degrees = tile_degrees
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        # (row, col, radius) -> {"center", "radius", "places", "expires_at"}
+        self._entries = OrderedDict()
+        # (row, col) -> keys of the entries fetched for that tile
+        self._by_tile = {}
+        self._lock = threading.Lock()
+
+    def tile(self, lat, lng):
+        return (
+            math.floor(lat / self.tile_degrees),
+            math.floor(lng / self.tile_degrees),
+        )
+
+    def tile_center(self, row, col):
+        return ((row + 0.5) * self.tile_degrees, (col + 0.5) * self.tile_degrees)
+
+    def fetch_radius(self, row, col, radius):
+        """
+        Radius (miles) to fetch from the tile center so the result covers a
+        `radius` query from any point in the tile.
+        """
+        center_lat, center_lng = self.tile_center(row, col)
+        half_diagonal = max(
+            haversine_distance(
+                center_lat,
+                center_lng,
+                row * self.tile_degrees + dr * self.tile_degrees,
+                col * self.tile_degrees + dc * self.tile_degrees,
+            )
+            for dr in (0, 1)
+            for dc in (0, 1)
+        )
+        return radius + half_diagonal
+
+    @staticmethod
+    def within(places, lat, lng, radius):
+        return [
+            {**place, "location": dict(place["location"])}
+            for place in places
+            if haversine_distance(
+                lat, lng, place["location"]["lat"], place["location"]["lng"]
+            )
+            <= radius
+        ]
+
+    def get(self, lat, lng, radius):
+        """
+        Return the cached places within `radius` miles of (lat, lng), or None if
+        no live entry covers the query circle.
+        """
+        row, col = self.tile(lat, lng)
+        now = time.time()
+        with self._lock:
+            # The query's own tile first, then its neighbours.
+            for dr, dc in sorted(
+                ((dr, dc) for dr in (-1, 0, 1) for dc in (-1, 0, 1)),
+                key=lambda d: abs(d[0]) + abs(d[1]),
+            ):
+                for key in list(self._by_tile.get((row + dr, col + dc), ())):
+                    entry = self._entries[key]
+                    if entry["expires_at"] <= now:
+                        self._drop(key)
+                        continue
+                    center_lat, center_lng = entry["center"]
+                    reach = haversine_distance(lat, lng, center_lat, center_lng) + radius
+                    if reach <= entry["radius"]:
+                        self._entries.move_to_end(key)
+                        self.hits += 1
+                        return self.within(entry["places"], lat, lng, radius)
+
+            self.misses += 1
+            return None
+
+    def _drop(self, key):
+        del self._entries[key]
+        keys = self._by_tile[key[:2]]
+        keys.discard(key)
+        if not keys:
+            del self._by_tile[key[:2]]
+
+    def fetch(self, lat, lng, radius, loader):
+        """
+        Answer from the cache, or call `loader(center_lat, center_lng,
+        fetch_radius)` for the query's tile and cache what it returns.
+        """
+        places = self.get(lat, lng, radius)
+        if places is not None:
+            return places
+
+        center, fetch_radius = self.fetch_area(lat, lng, radius)
+        fetched = loader(center[0], center[1], fetch_radius)
+        return self.put(lat, lng, radius, fetched)
+
+    def fetch_area(self, lat, lng, radius):
+        """
+        The (center, radius) a miss should be fetched with, for callers that
+        run the upstream request themselves and then hand the result to put().
+        """
+        row, col = self.tile(lat, lng)
+        return self.tile_center(row, col), self.fetch_radius(row, col, radius)
+
+    def put(self, lat, lng, radius, fetched):
+        """
+        Cache the places fetched for fetch_area(lat, lng, radius) and return
+        those within `radius` of (lat, lng).
+        """
+        row, col = self.tile(lat, lng)
+        center, fetch_radius = self.fetch_area(lat, lng, radius)
+        with self._lock:
+            key = (row, col, radius)
+            self._entries[key] = {
+                "center": center,
+                "radius": fetch_radius,
+                "places": fetched,
+                "expires_at": time.time() + self.ttl,
+            }
+            self._entries.move_to_end(key)
+            self._by_tile.setdefault((row, col), set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+
+        return self.within(fetched, lat, lng, radius)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_tile.clear()
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries)}
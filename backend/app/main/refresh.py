@@ -0,0 +1,92 @@
+import threading
+import time
+
+import sqlalchemy as sa
+from flask import current_app
+
+from app.main.heat_grid import safety_grid
+from app.main.response_cache import response_cache
+from app.main.spatial_index import incident_index
+
+# Marker of the incidents table the in-process structures were built from:
+# (incidents change counter, max incidents.id). Every write through the app
+# bumps the counter (see Incident.mark_changed), including upserts and deletes;
+# max(id) also catches rows inserted behind the app's back. Both are primary
+# key lookups.
+_marker = None
+_checked_at = 0.0
+_lock = threading.Lock()
+
+
+def _read_marker():
+    from app import db
+    from app.models import ChangeCounter, Incident
+
+    return (
+        ChangeCounter.read(ChangeCounter.INCIDENTS),
+        db.session.scalar(sa.select(sa.func.max(Incident.id))),
+    )
+
+
+def incidents_changed(points=None):
+    """
+    Bring the in-memory incident structures in line with the incidents table
+    after rows were added.
+
+    Args:
+        points: (lat, lng) of the new incidents, if known. The safety raster is
+            then refreshed around them; otherwise it is dropped and rebuilt on
+            next use.
+    """
+    global _marker
+    # Read before reloading, so a concurrent change by another worker still
+    # moves the marker past what we remember.
+    marker = _read_marker()
+    incident_index.reload()
+    response_cache.invalidate()
+    if points is None:
+        safety_grid.invalidate()
+    else:
+        safety_grid.refresh_around(points)
+    _marker = marker
+
+
+def check_for_changes():
+    """
+    Catch up with incidents written (imported, updated or archived) by another
+    process. Runs before every request to the main blueprint, but queries the
+    database at most every INCIDENT_INDEX_POLL_SECONDS.
+
+    With INCIDENT_SNAPSHOT_DIR set, the grid follows the shared snapshots and
+    its swap listeners drop the raster and response cache. Otherwise the table
+    marker is compared with the one this process last built from, and on a
+    change the grid is rebuilt and the raster and local response cache are
+    dropped.
+    """
+    global _marker, _checked_at
+    config = current_app.config
+    if config.get("INCIDENT_SNAPSHOT_DIR"):
+        incident_index.poll()
+        return
+
+    now = time.monotonic()
+    if now - _checked_at < config.get("INCIDENT_INDEX_POLL_SECONDS", 5.0):
+        return
+    # Only one thread checks; the others carry on with the current grid.
+    if not _lock.acquire(blocking=False):
+        return
+    try:
+        _checked_at = now
+        marker = _read_marker()
+        if _marker is None:
+            # First check: everything here is still to be built from the table.
+            _marker = marker
+            return
+        if marker == _marker:
+            return
+        _marker = marker
+        incident_index.reload()
+        safety_grid.invalidate()
+        response_cache.invalidate_local()
+    finally:
+        _lock.release()
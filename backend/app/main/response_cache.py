@@ -0,0 +1,340 @@
+"""
+Response cache for the read-only incident endpoints (/area_safety and
+/incidents_by_coords).
+
+Entries are the serialized JSON bodies, keyed on the normalized query (area
+text or rounded coordinates, plus radius). Every key belongs to a generation;
+incidents_changed bumps the generation, so all earlier entries stop matching
+at once and age out of the LRU.
+
+The storage is pluggable (RESPONSE_CACHE_BACKEND):
+  - "memory": per-process LRU bounded by RESPONSE_CACHE_MAX_BYTES (default)
+  - "sqlite": one SQLite file (RESPONSE_CACHE_PATH) shared by every worker on
+    the host, including the generation counter
+  - "none": caching disabled
+Other backends can be added with register_backend.
+"""
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app, jsonify
+
+from app.main.geocode_cache import normalize_address
+from app.main.spatial_index import incident_index
+
+# Rough per-entry bookkeeping cost on top of the key and body.
+ENTRY_OVERHEAD_BYTES = 200
+# A hit refreshes an SQLite row's LRU position at most this often, so reads
+# rarely turn into writes.
+TOUCH_INTERVAL_SECONDS = 60
+
+
+class MemoryBackend:
+    """
+    In-process LRU bounded by the total size of the cached bodies.
+    """
+
+    shared = False
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self._entries = OrderedDict()  # key -> (generation, body, expires_at)
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def generation(self):
+        return self._generation
+
+    def bump(self):
+        with self._lock:
+            self._generation += 1
+            return self._generation
+
+    def get(self, key, generation):
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] != generation or entry[2] <= now:
+                self._discard(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, generation, body, ttl):
+        size = len(key) + len(body) + ENTRY_OVERHEAD_BYTES
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            self._discard(key)
+            self._entries[key] = (generation, body, time.time() + ttl)
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                self._discard(next(iter(self._entries)))
+
+    def _discard(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.bytes -= len(key) + len(entry[1]) + ENTRY_OVERHEAD_BYTES
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def stats(self):
+        return {"entries": len(self._entries), "bytes": self.bytes}
+
+
+class SQLiteBackend:
+    """
+    Cache table in a local SQLite file, so every worker process on the host
+    shares entries and the generation counter. Bounded by the total size of the
+    cached bodies, evicting the least recently used rows.
+    """
+
+    shared = True
+
+    def __init__(self, path, max_bytes):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _db(self):
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS response_cache (
+                    key TEXT PRIMARY KEY,
+                    generation INTEGER NOT NULL,
+                    body BLOB NOT NULL,
+                    size INTEGER NOT NULL,
+                    expires_at REAL NOT NULL,
+                    used_at REAL NOT NULL
+                )
+                """
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS ix_response_cache_used_at "
+                "ON response_cache (used_at)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS response_cache_meta "
+                "(name TEXT PRIMARY KEY, value INTEGER NOT NULL)"
+            )
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def generation(self):
+        with self._lock:
+            row = (
+                self._db()
+                .execute("SELECT value FROM response_cache_meta WHERE name = 'generation'")
+                .fetchone()
+            )
+        return row[0] if row else 0
+
+    def bump(self):
+        with self._lock:
+            conn = self._db()
+            conn.execute(
+                "INSERT INTO response_cache_meta (name, value) VALUES ('generation', 1) "
+                "ON CONFLICT(name) DO UPDATE SET value = value + 1"
+            )
+            generation = conn.execute(
+                "SELECT value FROM response_cache_meta WHERE name = 'generation'"
+            ).fetchone()[0]
+            conn.execute("DELETE FROM response_cache WHERE generation < ?", (generation,))
+            conn.commit()
+            return generation
+
+    def get(self, key, generation):
+        now = time.time()
+        with self._lock:
+            conn = self._db()
+            row = conn.execute(
+                "SELECT body, used_at FROM response_cache "
+                "WHERE key = ? AND generation = ? AND expires_at > ?",
+                (key, generation, now),
+            ).fetchone()
+            if row is None:
+                return None
+            if now - row[1] > TOUCH_INTERVAL_SECONDS:
+                conn.execute(
+                    "UPDATE response_cache SET used_at = ? WHERE key = ?", (now, key)
+                )
+                conn.commit()
+            return bytes(row[0])
+
+    def set(self, key, generation, body, ttl):
+        size = len(key) + len(body) + ENTRY_OVERHEAD_BYTES
+        if size > self.max_bytes:
+            return
+        now = time.time()
+        with self._lock:
+            conn = self._db()
+            conn.execute(
+                "INSERT OR REPLACE INTO response_cache "
+                "(key, generation, body, size, expires_at, used_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, generation, body, size, now + ttl, now),
+            )
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM response_cache").fetchone()[0]
+            if total > self.max_bytes:
+                # Drop the least recently used rows until we are under budget.
+                conn.execute(
+                    """
+                    DELETE FROM response_cache WHERE key IN (
+                        SELECT key FROM (
+                            SELECT key, SUM(size) OVER (ORDER BY used_at, key) - size AS before
+                            FROM response_cache
+                        ) WHERE before < ?
+                    )
+                    """,
+                    (total - self.max_bytes,),
+                )
+            conn.commit()
+
+    def clear(self):
+        with self._lock:
+            conn = self._db()
+            conn.execute("DELETE FROM response_cache")
+            conn.commit()
+
+    def stats(self):
+        with self._lock:
+            entries, size = (
+                self._db()
+                .execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM response_cache")
+                .fetchone()
+            )
+        return {"entries": entries, "bytes": size}
+
+
+def _sqlite_backend(config):
+    backend_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    path = config.get("RESPONSE_CACHE_PATH") or os.path.join(backend_dir, "response_cache.db")
+    return SQLiteBackend(path, config.get("RESPONSE_CACHE_MAX_BYTES", 32 * 1024 * 1024))
+
+
+BACKENDS = {
+    "memory": lambda config: MemoryBackend(
+        config.get("RESPONSE_CACHE_MAX_BYTES", 32 * 1024 * 1024)
+    ),
+    "sqlite": _sqlite_backend,
+    "none": lambda config: None,
+}
+
+
+def register_backend(name, factory):
+    """
+    Make a backend selectable with RESPONSE_CACHE_BACKEND=<name>. `factory`
+    gets the app config and returns an object with the MemoryBackend interface
+    (generation, bump, get, set, clear, stats and a `shared` flag).
+    """
+    BACKENDS[name] = factory
+
+
+class ResponseCache:
+    def __init__(self):
+        self.backend = None
+        self.ttl = 3600
+        self.coord_decimals = 5
+        self.hits = 0
+        self.misses = 0
+        self._configured = False
+        self._lock = threading.Lock()
+
+    def configure(self, config):
+        with self._lock:
+            name = config.get("RESPONSE_CACHE_BACKEND", "memory")
+            if name not in BACKENDS:
+                raise ValueError(f"Unknown RESPONSE_CACHE_BACKEND {name!r}")
+            self.backend = BACKENDS[name](config)
+            self.ttl = config.get("RESPONSE_CACHE_TTL", 3600)
+            self.coord_decimals = config.get("RESPONSE_CACHE_COORD_DECIMALS", 5)
+            self._configured = True
+
+    def _backend(self):
+        if not self._configured:
+            self.configure(current_app.config)
+        return self.backend
+
+    def coords_key(self, endpoint, lat, lng, radius):
+        """
+        Key for a point query. Coordinates are rounded to
+        RESPONSE_CACHE_COORD_DECIMALS places (5 = about a metre), so requests a
+        hair apart share an entry.
+        """
+        return (
+            f"{endpoint}:{round(lat, self.coord_decimals)!r},"
+            f"{round(lng, self.coord_decimals)!r}:{round(radius, 4)!r}"
+        )
+
+    def area_key(self, endpoint, area, radius):
+        return f"{endpoint}:{normalize_address(area)}:{round(radius, 4)!r}"
+
+    def respond(self, key, build):
+        """
+        Return the cached response for `key`, or call build() -> (payload,
+        status), serialize it with jsonify and cache it if the status is 200.
+        """
+        backend = self._backend()
+        if backend is None:
+            payload, status = build()
+            return jsonify(payload), status
+
+        generation = backend.generation()
+        body = backend.get(key, generation)
+        if body is not None:
+            self.hits += 1
+            response = current_app.response_class(body, mimetype="application/json")
+            response.headers["X-Cache"] = "HIT"
+            return response, 200
+
+        self.misses += 1
+        payload, status = build()
+        response = jsonify(payload)
+        if status == 200:
+            backend.set(key, generation, response.get_data(), self.ttl)
+        response.headers["X-Cache"] = "MISS"
+        return response, status
+
+    def invalidate(self):
+        """
+        Start a new generation; every entry cached so far stops matching.
+        Must be called inside an application context.
+        """
+        backend = self._backend()
+        if backend is not None:
+            backend.bump()
+
+    def invalidate_local(self):
+        """
+        Another worker changed the incidents. A shared backend already got the
+        new generation from that worker; a per-process one needs its own bump.
+        """
+        backend = self.backend
+        if backend is not None and not backend.shared:
+            backend.bump()
+
+    def stats(self):
+        backend = self.backend
+        stats = {"hits": self.hits, "misses": self.misses}
+        if backend is not None:
+            stats.update(backend.stats())
+        return stats
+
+
+# Process-wide cache, configured from the app config on first use.
+response_cache = ResponseCache()
+incident_index.swap_listeners.append(response_cache.invalidate_local)
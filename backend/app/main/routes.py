@@ -1,5 +1,5 @@
 from app.main import bp
-from flask import request, jsonify
+from flask import request, jsonify, json, Response, stream_with_context, current_app
 from flask_login import current_user
 from app.models import Incident  # Your Incident model is already defined in models.py
 # from app.geocoding import geocode_address  # Function that calls the Google Geocoding API
@@ -7,10 +7,25 @@ from app.models import Incident  # Your Incident model is already defined in mod
 
 from app.main.import_data import populateIncidents
 from app.main.test_geocoding import geocode_address
-from app.main.utils import haversine_distance
-from app.main.utils import compute_safety_score
+from app.main.geocoding import get_geocode_cache, geocode_addresses
+from app.main.utils import compute_safety_score_array
+from app.main.utils import (
+    SCORING_WINDOW_DAYS,
+    haversine_many,
+    normalize_impact,
+    recency_impact_sum,
+)
 from app.main.find_locations import find_basketball_courts as fbc
+from app.main.court_pipeline import courts_with_safety
+from app.main.incident_store import IncidentStore
+from app.main.spatial_index import IncidentGrid
+from app.main.incident_queries import incidents_within
+from app.main.scoring import score_points
+from app.main.heat_grid import safety_grid
+from app.main.pagination import decode_cursor, encode_cursor, page_size
+from app.main.response_cache import response_cache
 from datetime import datetime, timedelta
+import heapq
 import math
 
 courts = [
@@ -42,52 +57,30 @@ def calculate_safety_score(incidents, lat, lng, radius):
     Computes a normalized safety score (1 = safest, 10 = most dangerous).
     - Filters out incidents older than 6 months (180 days).
     - Uses logarithmic scaling to handle extreme cases.
-    """
-    nearby_incidents = []
-    safety_score = 0
-    SIX_MONTHS_AGO = datetime.utcnow() - timedelta(days=180)  # Define 6-month cutoff
-
-    for incident in incidents:
-        if incident.date < SIX_MONTHS_AGO:
-            print(f"Skipping old incident {incident.id}, date: {incident.date}")
-            continue  # Skip incidents older than 6 months
-
-        print("Processing:", incident)
-        distance = haversine_distance(lat, lng, incident.latitude, incident.longitude)
-
-        if distance <= radius:
-            severity = max(1, min(10, incident.severity))
-
-            days_since_incident = (datetime.utcnow() - incident.date).days
-            recency_weight = math.exp(-days_since_incident / 30)
-
-            distance_factor = max(0.01, distance)
 
-            impact = (severity * recency_weight) / distance_factor
+    `incidents` may be a list of incidents, an IncidentStore, or an
+    IncidentGrid, in which case only the last 180 days of the grid cells around
+    (lat, lng) are visited. The per-incident math runs on NumPy arrays (see
+    app.main.utils).
+    """
+    if isinstance(incidents, IncidentGrid):
+        since = datetime.utcnow() - timedelta(days=SCORING_WINDOW_DAYS)
+        incidents = incidents.candidates(lat, lng, radius, since)
+    elif not isinstance(incidents, IncidentStore):
+        incidents = IncidentStore.from_incidents(incidents)
 
-            safety_score += impact
+    lats, lngs, severities, dates = incidents.arrays()
+    distances = haversine_many(lat, lng, lats, lngs)
 
-            incident_data = {
-                "id": incident.id,
-                "latitude": incident.latitude,
-                "longitude": incident.longitude,
-                "severity": severity,
-                "date": incident.date.isoformat(),
-                "distance": round(distance, 2),
-                "impact": round(impact, 3),
-            }
-            nearby_incidents.append(incident_data)
+    # Recency-weighted impact of every incident within the radius from the
+    # last 6 months (180 days).
+    safety_score = float(recency_impact_sum(distances, severities, dates, radius))
 
     # **Dynamic Scaling to Keep Score in 1-10 Range**
-    if safety_score == 0:
-        normalized_score = 1  # No incidents, safest
-    else:
-        MAX_POSSIBLE_SCORE = len(incidents) * 10
-        normalized_score = 1 + (9 * math.log10(1 + safety_score))  # Logarithmic scaling
+    normalized_score = float(normalize_impact(safety_score))
 
     return {
         "safety_score": round(normalized_score, 2),
-        # "incidents": nearby_incidents,
     }
 
 
@@ -101,23 +94,21 @@ def test():
         if not courts:
             return jsonify({"message": "no courts found nearby"}), 200
 
-        courts_with_safety = []
+        # Score every court in one pass over the incidents near any of them.
+        safety_scores = score_points(
+            [(court["location"]["lat"], court["location"]["lng"]) for court in courts],
+            incident_rad,  # Incident search radius
+        )
 
-        for court in courts:
-            safety_data = calculate_safety_score(
-                Incident.query.all(),  # All incidents
-                court["location"]["lat"],
-                court["location"]["lng"],
-                incident_rad,  # Incident search radius
-            )
+        courts_with_safety = []
 
+        for court, safety_score in zip(courts, safety_scores):
             # Step 3: Prepare court data with safety info
             court_data = {
                 "name": court["name"],
                 "latitude": court["location"]["lat"],
                 "longitude": court["location"]["lng"],
-                "safety_score": safety_data["safety_score"],
-                # "incidents": safety_data["incidents"],
+                "safety_score": safety_score,
             }
             courts_with_safety.append(court_data)
 
@@ -127,6 +118,30 @@ def test():
         return jsonify({"error": f"Could not process request: {str(e)}"}), 500
 
 
+@bp.route("/sloc/async")
+def sloc_async():
+    """
+    /sloc over every page of Places results, scoring pages as they arrive.
+    Returns what is ready when SLOC_DEADLINE_SECONDS runs out, flagged with
+    "incomplete": true.
+    """
+    try:
+        result = courts_with_safety(
+            current_user.latitude,
+            current_user.longitude,
+            radius_mi=0.1,
+            incident_radius=0.2,
+            timeout=current_app.config.get("SLOC_DEADLINE_SECONDS", 3.0),
+            concurrency=current_app.config.get("SLOC_CONCURRENCY", 4),
+        )
+        if not result["courts"] and not result["incomplete"]:
+            return jsonify({"message": "no courts found nearby"}), 200
+        return jsonify(result), 200
+
+    except Exception as e:
+        return jsonify({"error": f"Could not process request: {str(e)}"}), 500
+
+
 @bp.route("/bbcourts")
 def bbcourts():
     try:
@@ -141,8 +156,15 @@ def bbcourts():
 
 @bp.route("/populate", methods=["GET"])
 def populate():
-    populateIncidents()
-    return jsonify({"message": "Incidents populated"}), 200
+    """
+    Import app/main/cleaned_data.csv. Pass ?resume_from=<rows_read> to continue an
+    import that failed part way through, and ?full=1 to re-check rows older than
+    the last import.
+    """
+    resume_from = request.args.get("resume_from", 0, type=int)
+    full = request.args.get("full", "0") not in ("0", "false", "")
+    report = populateIncidents(resume_from=resume_from, incremental=not full)
+    return jsonify({"message": "Incidents populated", **report}), 200
 
 
 @bp.route("/geocode", methods=["POST"])
@@ -170,6 +192,45 @@ def geocode():
         return jsonify({"error": str(e)}), 500
 
 
+MAX_BATCH_ADDRESSES = 200
+
+
+@bp.route("/geocode/batch", methods=["POST"])
+def geocode_batch():
+    """
+    Geocode many addresses in one request.
+
+    Expects JSON payload:
+      {
+        "addresses": ["Center City, Philadelphia", "3301 Market St, Philadelphia"]
+      }
+
+    Returns:
+      JSON with one result per address, in input order. Each result has the
+      address and either "location" (lat/lng) or "error".
+    """
+    data = request.get_json(silent=True)
+    addresses = data.get("addresses") if isinstance(data, dict) else None
+    if not isinstance(addresses, list) or not all(
+        isinstance(address, str) for address in addresses
+    ):
+        return jsonify({"error": "Expected a list of strings in 'addresses'"}), 400
+    if len(addresses) > MAX_BATCH_ADDRESSES:
+        return jsonify(
+            {"error": f"At most {MAX_BATCH_ADDRESSES} addresses per request"}
+        ), 400
+
+    return jsonify({"results": geocode_addresses(addresses)}), 200
+
+
+@bp.route("/geocode/cache_stats", methods=["GET"])
+def geocode_cache_stats():
+    """
+    Hit/miss counters of this process's geocoding cache.
+    """
+    return jsonify(get_geocode_cache().stats()), 200
+
+
 @bp.route("/incidents_by_coords", methods=["POST"])
 def incidents_by_coords():
     """
@@ -179,11 +240,20 @@ def incidents_by_coords():
       {
           "lat": 39.9525839,
           "lng": -75.1652215,
-          "radius": 1.0   # optional, default is 1 mile
+          "radius": 1.0,  # optional, default is 1 mile
+          "limit": 50,    # optional, return one page of incidents
+          "cursor": "...",  # optional, "next_cursor" of the previous page
+          "stream": "ndjson"  # optional, "ndjson" or "json" (see below)
       }
 
     Returns:
       JSON object with a count of nearby incidents and a list of incidents, each with an additional "distance" attribute.
+      When "limit" or "cursor" is given, incidents are ordered by (distance, id),
+      at most "limit" are returned, and "next_cursor" continues from the last one.
+      With "stream", incidents are written out as they are found instead of
+      being collected first: "ndjson" sends one incident per line
+      (application/x-ndjson), "json" sends the usual object as a chunked
+      response with "count" after the list.
     """
     data = request.get_json()
     if not data:
@@ -201,25 +271,109 @@ def incidents_by_coords():
     except (TypeError, ValueError):
         radius = 1.0
 
-    # Query all incidents from the database.
-    incidents = Incident.query.all()
-    nearby_incidents = []
-
-    for incident in incidents:
-        distance = haversine_distance(lat, lng, incident.latitude, incident.longitude)
-        if distance <= radius:
-            incident_data = {
-                "id": incident.id,
-                "latitude": incident.latitude,
-                "longitude": incident.longitude,
-                "severity": incident.severity,
-                "date": incident.date.isoformat(),
-                "distance": round(distance, 2),
-            }
-            nearby_incidents.append(incident_data)
+    if "limit" in data or "cursor" in data:
+        return incidents_page(data, lat, lng, radius)
+
+    stream = data.get("stream")
+    if stream == "ndjson":
+        return Response(
+            stream_with_context(incidents_ndjson(lat, lng, radius)),
+            mimetype="application/x-ndjson",
+        )
+    if stream == "json":
+        return Response(
+            stream_with_context(incidents_json_chunks(lat, lng, radius)),
+            mimetype="application/json",
+        )
+    if stream is not None:
+        return jsonify({"error": "'stream' must be 'ndjson' or 'json'."}), 400
+
+    def build():
+        # Only visit the grid cells (or database rows) around the requested point.
+        nearby_incidents = []
 
-    result = {"count": len(nearby_incidents), "incidents": nearby_incidents}
-    return jsonify(result), 200
+        for incident, distance in incidents_within(lat, lng, radius):
+            nearby_incidents.append(incident_to_dict(incident, distance))
+
+        result = {"count": len(nearby_incidents), "incidents": nearby_incidents}
+        return result, 200
+
+    # Identical queries are answered from the response cache until incidents
+    # are next imported.
+    key = response_cache.coords_key("incidents_by_coords", lat, lng, radius)
+    return response_cache.respond(key, build)
+
+
+def incident_to_dict(incident, distance):
+    return {
+        "id": incident.id,
+        "latitude": incident.latitude,
+        "longitude": incident.longitude,
+        "severity": incident.severity,
+        "date": incident.date.isoformat(),
+        "distance": round(distance, 2),
+    }
+
+
+def incidents_ndjson(lat, lng, radius):
+    for incident, distance in incidents_within(lat, lng, radius):
+        yield json.dumps(incident_to_dict(incident, distance)) + "\n"
+
+
+def incidents_json_chunks(lat, lng, radius):
+    count = 0
+    yield '{"incidents": ['
+    for incident, distance in incidents_within(lat, lng, radius):
+        yield ("," if count else "") + json.dumps(incident_to_dict(incident, distance))
+        count += 1
+    yield f'], "count": {count}}}'
+
+
+def incidents_page(data, lat, lng, radius):
+    """
+    One keyset page of /incidents_by_coords, ordered by (distance, id).
+
+    Only the page itself is kept in memory: matches past the cursor go through a
+    bounded heap.
+    """
+    query = [lat, lng, radius]
+    try:
+        limit = page_size(data.get("limit"))
+        after = None
+        if data.get("cursor"):
+            cursor = decode_cursor(data["cursor"])
+            if cursor.get("q") != query:
+                raise ValueError("Cursor belongs to a different query")
+            after = (float(cursor["d"]), int(cursor["id"]))
+    except (KeyError, TypeError, ValueError):
+        return jsonify({"error": "Invalid 'limit' or 'cursor' parameter."}), 400
+
+    total = 0
+
+    def remaining():
+        nonlocal total
+        for incident, distance in incidents_within(lat, lng, radius):
+            total += 1
+            if after is None or (distance, incident.id) > after:
+                yield distance, incident.id, incident
+
+    page = heapq.nsmallest(limit + 1, remaining(), key=lambda match: match[:2])
+
+    next_cursor = None
+    if len(page) > limit:
+        page = page[:limit]
+        distance, incident_id, _ = page[-1]
+        next_cursor = encode_cursor({"q": query, "d": distance, "id": incident_id})
+
+    return jsonify(
+        {
+            "count": total,
+            "incidents": [
+                incident_to_dict(incident, distance) for distance, _, incident in page
+            ],
+            "next_cursor": next_cursor,
+        }
+    ), 200
 
 
 @bp.route("/area_safety", methods=["POST"])
@@ -240,35 +394,76 @@ def area_safety():
     area = data["area"]
     radius = float(data.get("radius", 1.0))
 
-    try:
-        # Get coordinates for the area.
-        location = geocode_address(area)
-        center_lat = location["lat"]
-        center_lng = location["lng"]
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
-
-    # Query incidents from the database.
-    all_incidents = Incident.query.all()
-    nearby_incidents = []
-    for incident in all_incidents:
-        distance = haversine_distance(
-            center_lat, center_lng, incident.latitude, incident.longitude
-        )
-        if distance <= radius:
-            nearby_incidents.append(incident)
-
-    # Compute the safety score using our helper function.
-    safety = compute_safety_score(nearby_incidents)
-
-    return jsonify(
-        {
+    def build():
+        try:
+            # Get coordinates for the area.
+            location = geocode_address(area)
+            center_lat = location["lat"]
+            center_lng = location["lng"]
+        except Exception as e:
+            return {"error": str(e)}, 500
+
+        # Look up incidents around the area's center.
+        nearby_incidents = [
+            incident
+            for incident, _ in incidents_within(center_lat, center_lng, radius)
+        ]
+
+        # Compute the safety score using our helper function.
+        safety = compute_safety_score_array([i.severity for i in nearby_incidents])
+
+        return {
             "area": area,
             "coordinates": {"lat": center_lat, "lng": center_lng},
             "incident_count": len(nearby_incidents),
             "safety_score": round(safety, 2),
-        }
-    ), 200
+        }, 200
+
+    # Popular areas are answered from the response cache (keyed on the
+    # normalized area text) until incidents are next imported.
+    return response_cache.respond(response_cache.area_key("area_safety", area, radius), build)
+
+
+@bp.route("/safety_grid", methods=["GET"])
+def safety_grid_info():
+    """
+    Describe the precomputed safety raster (bounds, cell size, tile layout).
+    """
+    return jsonify(safety_grid.describe()), 200
+
+
+@bp.route("/safety_grid/cell", methods=["GET"])
+def safety_grid_cell():
+    """
+    Look up the precomputed safety score (1 = safest, 10 = most dangerous) for a
+    point.
+
+    Query parameters:
+      lat, lng: coordinates of the point.
+    """
+    try:
+        lat = float(request.args.get("lat"))
+        lng = float(request.args.get("lng"))
+    except (TypeError, ValueError):
+        return jsonify({"error": "Invalid or missing 'lat' or 'lng' parameters."}), 400
+
+    score = safety_grid.lookup(lat, lng)
+    if score is None:
+        return jsonify({"error": "Coordinates are outside the safety grid"}), 404
+
+    return jsonify({"lat": lat, "lng": lng, "safety_score": round(score, 2)}), 200
+
+
+@bp.route("/safety_grid/tile/<int:tile_row>/<int:tile_col>", methods=["GET"])
+def safety_grid_tile(tile_row, tile_col):
+    """
+    Return one tile of precomputed safety scores. Row 0 / column 0 is the
+    south-west corner of the grid.
+    """
+    tile = safety_grid.tile(tile_row, tile_col)
+    if tile is None:
+        return jsonify({"error": "Tile not found"}), 404
+    return jsonify(tile), 200
 
 
 # @bp.route('/danger', methods=['GET'])
@@ -0,0 +1,77 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from app.main.incident_queries import index_enabled, select_candidates
+from app.main.incident_store import IncidentStore
+from app.main.spatial_index import IncidentGrid, incident_index
+from app.main.utils import (
+    SCORING_WINDOW_DAYS,
+    haversine_matrix,
+    normalize_impact,
+    recency_impact_sum,
+)
+
+# Upper bound on the number of (point, incident) distances held in memory at once.
+MAX_MATRIX_CELLS = 4_000_000
+
+
+def score_points(points, radius, incidents=None, now=None):
+    """
+    Compute calculate_safety_score for many query points in a single pass.
+
+    The incidents near any of the points are gathered once from the grid (or
+    taken from `incidents` if it is a store or a plain list) as an
+    IncidentStore, and every point is scored against that one snapshot with a
+    point-by-incident distance matrix.
+
+    Args:
+        points: Sequence of (lat, lng) pairs.
+        radius: Incident search radius in miles.
+        incidents: An IncidentGrid, IncidentStore or list of incidents.
+            Defaults to the
+            process-wide grid, or to a bounding-box query against the database
+            when the grid is disabled.
+        now: Reference time for the recency weight (defaults to utcnow).
+
+    Returns:
+        list: One normalized safety score (1 = safest, 10 = most dangerous) per
+        point, rounded to 2 decimals, in input order.
+    """
+    points = list(points)
+    if not points:
+        return []
+    if now is None:
+        now = datetime.utcnow()
+    if incidents is None:
+        if index_enabled():
+            incidents = incident_index
+        else:
+            incidents = select_candidates(
+                points, radius, since=now - timedelta(days=SCORING_WINDOW_DAYS)
+            )
+
+    if isinstance(incidents, IncidentGrid):
+        incidents = incidents.candidates_many(
+            points, radius, since=now - timedelta(days=SCORING_WINDOW_DAYS)
+        )
+    elif not isinstance(incidents, IncidentStore):
+        incidents = IncidentStore.from_incidents(incidents)
+
+    lats, lngs, severities, dates = incidents.arrays()
+    point_lats = np.array([lat for lat, _ in points], dtype=np.float64)
+    point_lngs = np.array([lng for _, lng in points], dtype=np.float64)
+
+    totals = np.zeros(len(points), dtype=np.float64)
+    if lats.size:
+        chunk = max(1, MAX_MATRIX_CELLS // lats.size)
+        for start in range(0, len(points), chunk):
+            stop = start + chunk
+            distances = haversine_matrix(
+                point_lats[start:stop], point_lngs[start:stop], lats, lngs
+            )
+            totals[start:stop] = recency_impact_sum(
+                distances, severities, dates, radius, now=now
+            )
+
+    return [round(float(score), 2) for score in normalize_impact(totals)]
@@ -0,0 +1,352 @@
+import math
+import threading
+import time
+from collections import namedtuple
+
+import click
+import numpy as np
+from flask import current_app
+from flask.cli import with_appcontext
+
+from app.main import incident_snapshot
+from app.main.incident_store import IncidentStore
+from app.main.utils import EARTH_RADIUS_MI
+
+DEFAULT_CELL_DEGREES = 0.01  # roughly 0.7 miles north/south around Philadelphia
+
+# Padding (in degrees) added to every bounding box so floating point rounding in
+# haversine_distance can never push a point that passes the radius check outside
+# the cells we visit.
+BOX_EPSILON = 1e-9
+
+
+def bounding_box(lat, lng, radius):
+    """
+    Return the (min_lat, max_lat, min_lng, max_lng) box that contains every point
+    within `radius` miles (great-circle) of (lat, lng).
+
+    If the box crosses a pole or the antimeridian, the longitude range is widened
+    to the whole globe.
+    """
+    angular = radius / EARTH_RADIUS_MI
+    dlat = math.degrees(angular)
+    min_lat = lat - dlat - BOX_EPSILON
+    max_lat = lat + dlat + BOX_EPSILON
+
+    if min_lat <= -90 or max_lat >= 90 or angular >= math.pi / 2:
+        return max(min_lat, -90.0), min(max_lat, 90.0), -180.0, 180.0
+
+    ratio = math.sin(angular) / math.cos(math.radians(lat))
+    if ratio >= 1:
+        return min_lat, max_lat, -180.0, 180.0
+
+    dlng = math.degrees(math.asin(ratio))
+    min_lng = lng - dlng - BOX_EPSILON
+    max_lng = lng + dlng + BOX_EPSILON
+    if min_lng < -180 or max_lng > 180:
+        return min_lat, max_lat, -180.0, 180.0
+
+    return min_lat, max_lat, min_lng, max_lng
+
+
+def cell_of(lat, lng, cell_degrees):
+    return math.floor(lat / cell_degrees), math.floor(lng / cell_degrees)
+
+
+def cells_overlapping(cells, cell_degrees, lat, lng, radius):
+    """
+    Yield the keys of the occupied cells in `cells` (a mapping keyed by
+    cell_of()) that overlap the bounding box of the query circle.
+    """
+    min_lat, max_lat, min_lng, max_lng = bounding_box(lat, lng, radius)
+    min_row, min_col = cell_of(min_lat, min_lng, cell_degrees)
+    max_row, max_col = cell_of(max_lat, max_lng, cell_degrees)
+
+    # Very large boxes cover more grid positions than there are occupied
+    # cells, so walk the occupied cells instead.
+    if (max_row - min_row + 1) * (max_col - min_col + 1) > len(cells):
+        for row, col in list(cells):
+            if min_row <= row <= max_row and min_col <= col <= max_col:
+                yield row, col
+        return
+
+    for row in range(min_row, max_row + 1):
+        for col in range(min_col, max_col + 1):
+            if (row, col) in cells:
+                yield row, col
+
+
+GridSnapshot = namedtuple("GridSnapshot", ["store", "cells"])
+
+
+class IncidentGrid:
+    """
+    Uniform lat/lng grid over the incidents table.
+
+    Incidents are bucketed into square cells of `cell_degrees` on a side, so a
+    radius query only touches the cells overlapping the query's bounding box
+    instead of every row in the table. The incidents live in one IncidentStore
+    sorted by cell, and each cell is a (start, stop) slice of it.
+
+    Within a cell, incidents are in date order, so a "since" cutoff is a binary
+    search per cell rather than a filter over the cell's whole history.
+
+    If INCIDENT_SNAPSHOT_DIR is configured, the grid is shared between worker
+    processes through memory-mapped snapshot files (see
+    app.main.incident_snapshot): it is read from the newest snapshot instead of
+    the table, and a newer snapshot written by another process is picked up
+    within INCIDENT_SNAPSHOT_POLL_SECONDS.
+    """
+
+    def __init__(self, cell_degrees=None):
+        self.cell_degrees = cell_degrees
+        self._snapshot = None
+        self._lock = threading.Lock()
+        # Shared snapshot files, set up from the app config on first load.
+        self._snapshot_dir = None
+        self._snapshot_source = None
+        self._snapshot_keep = 3
+        self._snapshot_poll = 2.0
+        self._version = None
+        self._checked_at = 0.0
+        # Called after swapping to a snapshot published by another process.
+        self.swap_listeners = []
+
+    def __len__(self):
+        snapshot = self._snapshot
+        return len(snapshot.store) if snapshot is not None else 0
+
+    @property
+    def loaded(self):
+        return self._snapshot is not None
+
+    def _cell(self, lat, lng):
+        return cell_of(lat, lng, self.cell_degrees)
+
+    def build(self, store):
+        """
+        Sort `store` by cell, then date, and index the cells. Returns a
+        GridSnapshot.
+        """
+        rows = np.floor(store.latitudes / self.cell_degrees).astype(np.int64)
+        cols = np.floor(store.longitudes / self.cell_degrees).astype(np.int64)
+        order = np.lexsort((store.seconds, store.days, cols, rows))
+        store, rows, cols = store.take(order), rows[order], cols[order]
+
+        cells = {}
+        if len(store):
+            starts = np.flatnonzero(
+                np.concatenate(([True], (rows[1:] != rows[:-1]) | (cols[1:] != cols[:-1])))
+            )
+            stops = np.append(starts[1:], len(store))
+            for start, stop in zip(starts.tolist(), stops.tolist()):
+                cells[(int(rows[start]), int(cols[start]))] = (start, stop)
+        return GridSnapshot(store, cells)
+
+    def _configure(self):
+        config = current_app.config
+        if self.cell_degrees is None:
+            self.cell_degrees = config.get(
+                "INCIDENT_INDEX_CELL_DEGREES", DEFAULT_CELL_DEGREES
+            )
+        self._snapshot_dir = config.get("INCIDENT_SNAPSHOT_DIR") or None
+        self._snapshot_source = incident_snapshot.source_id(
+            config["SQLALCHEMY_DATABASE_URI"]
+        )
+        self._snapshot_keep = config.get("INCIDENT_SNAPSHOT_KEEP", 3)
+        self._snapshot_poll = config.get("INCIDENT_SNAPSHOT_POLL_SECONDS", 2.0)
+
+    def _open_version(self, version):
+        store, cells = incident_snapshot.open_snapshot(
+            self._snapshot_dir, version, self.cell_degrees, self._snapshot_source
+        )
+        self._snapshot = GridSnapshot(store, cells)
+        self._version = version
+
+    def _open_current(self):
+        """
+        Switch to the newest snapshot on disk. Returns False if there is none
+        usable for this database.
+        """
+        version = incident_snapshot.current_version(self._snapshot_dir)
+        if version is None:
+            return False
+        if version == self._version:
+            return True
+        try:
+            self._open_version(version)
+        except (incident_snapshot.SnapshotMismatch, FileNotFoundError):
+            return False
+        return True
+
+    def publish(self):
+        """
+        Build the grid from the incidents table, write it as the newest shared
+        snapshot and switch to the mapped copy. Must be called inside an
+        application context, with INCIDENT_SNAPSHOT_DIR set.
+        """
+        snapshot = self.build(IncidentStore.load())
+        version = incident_snapshot.write_snapshot(
+            self._snapshot_dir,
+            snapshot.store,
+            snapshot.cells,
+            self.cell_degrees,
+            self._snapshot_source,
+            keep=self._snapshot_keep,
+        )
+        self._open_version(version)
+
+    def load(self):
+        """
+        (Re)build the grid. Must be called inside an application context.
+
+        Reads the newest shared snapshot if there is one, and the incidents
+        table otherwise (publishing a snapshot from it when snapshots are
+        enabled). The new grid is built off to the side and swapped in with one
+        assignment, so concurrent readers keep using the old one until then and
+        never wait on the reload.
+        """
+        self._configure()
+        if self._snapshot_dir is None:
+            self._snapshot = self.build(IncidentStore.load())
+        elif not self._open_current():
+            self.publish()
+        self._checked_at = time.monotonic()
+
+    def reload(self):
+        """
+        Bring the grid up to date after the incidents table changed.
+
+        With shared snapshots, a new snapshot is always written so the other
+        workers pick the change up. Otherwise the grid is rebuilt if it has been
+        loaded; a grid nobody has used yet is left to load lazily.
+        """
+        with self._lock:
+            self._configure()
+            if self._snapshot_dir is not None:
+                self.publish()
+            elif self._snapshot is not None:
+                self.load()
+
+    def _poll(self):
+        """
+        Hot-swap to a newer shared snapshot, checking at most every
+        INCIDENT_SNAPSHOT_POLL_SECONDS. Readers never wait: only one thread
+        checks, and the others carry on with the current grid meanwhile.
+        """
+        now = time.monotonic()
+        if now - self._checked_at < self._snapshot_poll:
+            return
+        if not self._lock.acquire(blocking=False):
+            return
+        try:
+            self._checked_at = now
+            previous = self._version
+            self._open_current()
+        finally:
+            self._lock.release()
+        if self._version != previous:
+            for listener in self.swap_listeners:
+                listener()
+
+    def poll(self):
+        """
+        Check for a newer shared snapshot (throttled like every query), e.g.
+        before answering from a cache built on the current grid.
+        """
+        if self._snapshot is not None and self._snapshot_dir is not None:
+            self._poll()
+
+    def ensure_loaded(self):
+        """
+        Build the grid if needed and return its current GridSnapshot.
+        """
+        snapshot = self._snapshot
+        if snapshot is None:
+            with self._lock:
+                if self._snapshot is None:
+                    self.load()
+                snapshot = self._snapshot
+        elif self._snapshot_dir is not None:
+            self._poll()
+            snapshot = self._snapshot
+        return snapshot
+
+    @property
+    def store(self):
+        """
+        Every incident in the grid, as an IncidentStore.
+        """
+        return self.ensure_loaded().store
+
+    def invalidate(self):
+        """
+        Drop the grid; the next query rebuilds it from the database.
+        """
+        with self._lock:
+            self._snapshot = None
+            self._version = None
+
+    def _take_cells(self, snapshot, keys, since=None):
+        store = snapshot.store
+        ranges = []
+        for key in keys:
+            start, stop = snapshot.cells[key]
+            if since is not None:
+                start = store.first_since(since, start, stop)
+            if start < stop:
+                ranges.append(np.arange(start, stop))
+        if not ranges:
+            return store.take(np.zeros(0, dtype=np.int64))
+        return store.take(np.concatenate(ranges))
+
+    def candidates(self, lat, lng, radius, since=None):
+        """
+        IncidentStore of every incident stored in a cell overlapping the
+        bounding box of the query circle, limited to incidents on or after
+        `since` if it is given. Callers still need to apply the exact distance
+        check.
+        """
+        snapshot = self.ensure_loaded()
+        keys = cells_overlapping(snapshot.cells, self.cell_degrees, lat, lng, radius)
+        return self._take_cells(snapshot, keys, since)
+
+    def candidates_many(self, points, radius, since=None):
+        """
+        Like candidates(), but for several (lat, lng) points at once. Every
+        incident is included at most once, even when the points' boxes overlap.
+        """
+        snapshot = self.ensure_loaded()
+        keys = set()
+        for lat, lng in points:
+            keys.update(
+                cells_overlapping(snapshot.cells, self.cell_degrees, lat, lng, radius)
+            )
+        return self._take_cells(snapshot, sorted(keys), since)
+
+    def within(self, lat, lng, radius, since=None):
+        """
+        Yield (incident, distance) for every incident within `radius` miles of
+        (lat, lng). Incidents are IncidentRecords. If `since` is given, older
+        incidents are skipped.
+        """
+        return self.candidates(lat, lng, radius, since).within(lat, lng, radius)
+
+
+# Process-wide grid, built lazily on first use.
+incident_index = IncidentGrid()
+
+
+@click.command("publish-incident-snapshot")
+@with_appcontext
+def publish_snapshot_command():
+    """
+    Write the incident grid to INCIDENT_SNAPSHOT_DIR, e.g. before starting the
+    workers so none of them has to read the incidents table.
+    """
+    incident_index._configure()
+    if incident_index._snapshot_dir is None:
+        raise click.ClickException("INCIDENT_SNAPSHOT_DIR is not set")
+    with incident_index._lock:
+        incident_index.publish()
+    print(f"Published {incident_index._version} ({len(incident_index)} incidents)")
@@ -1,5 +1,11 @@
 # app/utils.py
 import math
+from datetime import datetime, timedelta
+
+import numpy as np
+
+EARTH_RADIUS_MI = 3958.8  # Earth radius in miles
+
 
 def haversine_distance(lat1, lon1, lat2, lon2):
     """
@@ -12,7 +18,7 @@ def haversine_distance(lat1, lon1, lat2, lon2):
     Returns:
         float: The distance between the two points in miles.
     """
-    R = 3958.8  # Earth radius in miles
+    R = EARTH_RADIUS_MI
     phi1 = math.radians(lat1)
     phi2 = math.radians(lat2)
     delta_phi = math.radians(lat2 - lat1)
@@ -65,3 +71,143 @@ def compute_safety_score(incidents):
     safety_score = max(0, 100 - danger_index * scaling_factor)
     return safety_score
 
+
+# Vectorized kernels
+#
+# The functions below mirror haversine_distance, the impact sum in
+# routes.calculate_safety_score and compute_safety_score, but operate on
+# contiguous NumPy arrays (latitude, longitude, severity, date) instead of
+# one ORM object at a time.
+
+SCORING_WINDOW_DAYS = 180  # incidents older than this are ignored when scoring
+RECENCY_DECAY_DAYS = 30  # e-folding time of the recency weight
+MIN_DISTANCE_MI = 0.01  # distances are clamped to this to avoid dividing by zero
+
+
+def incident_arrays(incidents):
+    """
+    Convert an iterable of incidents (ORM objects or rows) into parallel arrays.
+
+    Returns:
+        tuple: (latitudes float64, longitudes float64, severities int64,
+        dates datetime64[us])
+    """
+    incidents = list(incidents)
+    lats = np.fromiter((i.latitude for i in incidents), np.float64, len(incidents))
+    lngs = np.fromiter((i.longitude for i in incidents), np.float64, len(incidents))
+    severities = np.fromiter((i.severity for i in incidents), np.int64, len(incidents))
+    dates = np.array([i.date for i in incidents], dtype="datetime64[us]")
+    return lats, lngs, severities, dates
+
+
+def haversine_many(lat, lng, lats, lngs):
+    """
+    One-to-many great-circle distance in miles from (lat, lng) to every point in
+    the `lats` / `lngs` arrays.
+    """
+    lats = np.asarray(lats, dtype=np.float64)
+    lngs = np.asarray(lngs, dtype=np.float64)
+
+    phi1 = math.radians(lat)
+    phi2 = np.radians(lats)
+    delta_phi = np.radians(lats - lat)
+    delta_lambda = np.radians(lngs - lng)
+
+    a = np.sin(delta_phi / 2) ** 2 + math.cos(phi1) * np.cos(phi2) * np.sin(
+        delta_lambda / 2
+    ) ** 2
+    c = 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+    return EARTH_RADIUS_MI * c
+
+
+def haversine_matrix(lats1, lngs1, lats2, lngs2):
+    """
+    Many-to-many great-circle distance in miles.
+
+    Returns:
+        ndarray: shape (len(lats1), len(lats2)) where [i, j] is the distance
+        between point i of the first set and point j of the second.
+    """
+    lats1 = np.asarray(lats1, dtype=np.float64)[:, np.newaxis]
+    lngs1 = np.asarray(lngs1, dtype=np.float64)[:, np.newaxis]
+    lats2 = np.asarray(lats2, dtype=np.float64)[np.newaxis, :]
+    lngs2 = np.asarray(lngs2, dtype=np.float64)[np.newaxis, :]
+
+    phi1 = np.radians(lats1)
+    phi2 = np.radians(lats2)
+    delta_phi = np.radians(lats2 - lats1)
+    delta_lambda = np.radians(lngs2 - lngs1)
+
+    a = np.sin(delta_phi / 2) ** 2 + np.cos(phi1) * np.cos(phi2) * np.sin(
+        delta_lambda / 2
+    ) ** 2
+    c = 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+    return EARTH_RADIUS_MI * c
+
+
+def days_since(dates, now=None):
+    """
+    Whole days elapsed between each date and `now`, floored the same way as
+    `timedelta.days`.
+    """
+    if now is None:
+        now = datetime.utcnow()
+    elapsed = np.datetime64(now, "us") - np.asarray(dates, dtype="datetime64[us]")
+    return elapsed // np.timedelta64(1, "D")
+
+
+def recency_impact_sum(distances, severities, dates, radius, now=None):
+    """
+    Vectorized recency-weighted impact sum used by calculate_safety_score.
+
+    For every incident within `radius` miles and newer than SCORING_WINDOW_DAYS:
+        impact = clamp(severity, 1, 10) * exp(-days_since / 30) / max(0.01, distance)
+
+    Args:
+        distances: Distances in miles, shape (n,) or (points, n).
+        severities, dates: Per-incident arrays of shape (n,).
+        radius: Search radius in miles.
+        now: Reference time (defaults to datetime.utcnow()).
+
+    Returns:
+        float or ndarray: The summed impact, one value per row of `distances`.
+    """
+    if now is None:
+        now = datetime.utcnow()
+    distances = np.asarray(distances, dtype=np.float64)
+    cutoff = np.datetime64(now - timedelta(days=SCORING_WINDOW_DAYS), "us")
+    dates = np.asarray(dates, dtype="datetime64[us]")
+
+    severity = np.clip(np.asarray(severities, dtype=np.float64), 1, 10)
+    recency_weight = np.exp(-days_since(dates, now) / RECENCY_DECAY_DAYS)
+    recency_weight = np.where(dates < cutoff, 0.0, recency_weight)
+
+    impact = (severity * recency_weight) / np.maximum(MIN_DISTANCE_MI, distances)
+    impact = np.where(distances <= radius, impact, 0.0)
+    return impact.sum(axis=-1)
+
+
+def normalize_impact(total_impact):
+    """
+    Map a raw impact sum onto calculate_safety_score's 1-10 scale
+    (1 = safest, 10 = most dangerous).
+    """
+    total_impact = np.asarray(total_impact, dtype=np.float64)
+    return np.where(total_impact == 0, 1.0, 1 + 9 * np.log10(1 + total_impact))
+
+
+def compute_safety_score_array(severities):
+    """
+    Vectorized compute_safety_score over an array of incident severities.
+
+    Returns 100 if the array is empty.
+    """
+    severities = np.asarray(severities, dtype=np.float64)
+    n = severities.size
+    if n == 0:
+        return 100.0
+
+    normalized_severity = severities.mean() / 10.0
+    danger_index = normalized_severity * math.log(n + 1)
+    scaling_factor = 50
+    return float(max(0, 100 - danger_index * scaling_factor))
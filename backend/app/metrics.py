@@ -0,0 +1,272 @@
+"""
+Request, SQL and upstream-call metrics, served in the Prometheus text format on
+/metrics to scrapers that present METRICS_TOKEN as a bearer token. Without a
+token configured the numbers are still recorded but /metrics answers 404, as
+the app's CORS settings would otherwise hand them to any origin.
+
+Everything is kept in process memory behind one lock per metric, so recording a
+sample is a dict lookup and a few additions. Each worker process exposes its
+own numbers; scrape every worker (or sum them) when running several.
+"""
+import bisect
+import hmac
+import threading
+import time
+
+import sqlalchemy as sa
+from flask import Response, abort, current_app, g, has_request_context, request
+
+# Latency buckets in seconds, from fast in-memory lookups to slow imports.
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+# Buckets for the number of SQL statements a single request runs.
+STATEMENT_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 25, 50, 100, 250)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    pairs.extend(f'{name}="{_escape(value)}"' for name, value in extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels=(), amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, labels=()):
+        return self._values.get(labels, 0)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = sorted(self._values.items())
+        for labels, value in values:
+            lines.append(f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [per-bucket counts (last one is +Inf), sum, count]
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def count(self, labels=()):
+        series = self._series.get(labels)
+        return series[2] if series else 0
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = sorted(
+                (labels, (list(counts), total, count))
+                for labels, (counts, total, count) in self._series.items()
+            )
+        for labels, (counts, total, count) in series:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = _labels(self.labelnames, labels, [("le", _number(bound))])
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            label_text = _labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{label_text} {_number(total)}")
+            lines.append(f"{self.name}_count{label_text} {count}")
+        return lines
+
+
+request_duration = Histogram(
+    "phillyflow_http_request_duration_seconds",
+    "Time spent handling a request, by blueprint and route.",
+    ("blueprint", "endpoint", "method"),
+)
+requests_total = Counter(
+    "phillyflow_http_requests_total",
+    "Requests handled, by blueprint, route and status code.",
+    ("blueprint", "endpoint", "method", "status"),
+)
+request_statements = Histogram(
+    "phillyflow_http_request_sql_statements",
+    "SQL statements executed while handling one request.",
+    ("blueprint", "endpoint"),
+    buckets=STATEMENT_COUNT_BUCKETS,
+)
+sql_duration = Histogram(
+    "phillyflow_sql_statement_duration_seconds",
+    "SQL statement execution time, by statement type.",
+    ("operation",),
+)
+sql_errors = Counter(
+    "phillyflow_sql_statement_errors_total",
+    "SQL statements that raised, by statement type.",
+    ("operation",),
+)
+upstream_duration = Histogram(
+    "phillyflow_upstream_request_duration_seconds",
+    "Outbound HTTP call time (Google APIs), by call name.",
+    ("name",),
+)
+upstream_errors = Counter(
+    "phillyflow_upstream_request_errors_total",
+    "Outbound HTTP calls that failed or returned an error status, by call name.",
+    ("name",),
+)
+upstream_statuses = Counter(
+    "phillyflow_upstream_api_status_total",
+    "Google API responses by the \"status\" field of their body.",
+    ("name", "status"),
+)
+
+ALL_METRICS = (
+    request_duration,
+    requests_total,
+    request_statements,
+    sql_duration,
+    sql_errors,
+    upstream_duration,
+    upstream_errors,
+    upstream_statuses,
+)
+
+
+def render():
+    lines = []
+    for metric in ALL_METRICS:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+def record_upstream(name, seconds, error=False):
+    """
+    Record one outbound call; used by app.main.http_client.
+    """
+    upstream_duration.observe((name,), seconds)
+    if error:
+        upstream_errors.inc((name,))
+
+
+def record_upstream_status(name, status):
+    """
+    Record the API-level status of a Google response (OK, ZERO_RESULTS,
+    OVER_QUERY_LIMIT, ...), which arrives with HTTP 200 even on errors.
+    """
+    upstream_statuses.inc((name, status or "UNKNOWN"))
+
+
+def _operation(statement):
+    words = statement.lstrip().split(None, 1)
+    operation = words[0].upper() if words else ""
+    if operation in ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH"):
+        return operation
+    return "OTHER"
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("metrics_query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start = conn.info["metrics_query_start"].pop()
+    sql_duration.observe((_operation(statement),), time.perf_counter() - start)
+    if has_request_context():
+        g.metrics_statements = g.get("metrics_statements", 0) + 1
+
+
+def _handle_error(context):
+    starts = context.connection.info.get("metrics_query_start") if context.connection else None
+    if starts:
+        starts.pop()
+    sql_errors.inc((_operation(context.statement or ""),))
+
+
+def _route_labels():
+    endpoint = request.endpoint or "unmatched"
+    return request.blueprint or "", endpoint
+
+
+def _start_timer():
+    g.metrics_start = time.perf_counter()
+    g.metrics_statements = 0
+
+
+def _record(status):
+    start = g.pop("metrics_start", None)
+    if start is None:
+        return
+    blueprint, endpoint = _route_labels()
+    request_duration.observe(
+        (blueprint, endpoint, request.method), time.perf_counter() - start
+    )
+    requests_total.inc((blueprint, endpoint, request.method, str(status)))
+    request_statements.observe((blueprint, endpoint), g.pop("metrics_statements", 0))
+
+
+def _stop_timer(response):
+    _record(response.status_code)
+    return response
+
+
+def _teardown(exc):
+    # after_request is skipped when an exception propagates out of the view
+    # (PROPAGATE_EXCEPTIONS, or an error in another after_request function);
+    # count those requests as 500s.
+    _record(500)
+
+
+def metrics_view():
+    token = current_app.config.get("METRICS_TOKEN")
+    if not token:
+        abort(404)
+    supplied = request.headers.get("Authorization", "")
+    if not hmac.compare_digest(supplied.encode(), f"Bearer {token}".encode()):
+        abort(401)
+    return Response(render(), mimetype="text/plain; version=0.0.4")
+
+
+def init_app(app, db):
+    """
+    Time every request, listen to the app's SQLAlchemy engine and serve
+    /metrics. Request timings cover the view up to the response being built;
+    the body of a streamed response is not included.
+    """
+    app.before_request(_start_timer)
+    app.after_request(_stop_timer)
+    app.teardown_request(_teardown)
+    app.add_url_rule("/metrics", "metrics", metrics_view)
+
+    with app.app_context():
+        engine = db.engine
+    if not sa.event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        sa.event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        sa.event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+        sa.event.listen(engine, "handle_error", _handle_error)
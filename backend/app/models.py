@@ -2,16 +2,27 @@ import sqlalchemy as sa
 import sqlalchemy.orm as so
 from app import db, login
 from flask_login import UserMixin
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 from time import time
 from typing import Optional, List
 from werkzeug.security import generate_password_hash, check_password_hash
 import jwt
 from flask import current_app
+from app.user_cache import user_cache, watch_user_model
 
 import csv
+import hashlib
 import io
 
+# Natural keys looked up per IN (...) when checking imports against the
+# archive, well under SQLite's bound parameter limit.
+ARCHIVE_LOOKUP_CHUNK = 500
+
+# Incremental imports re-read rows dated up to this long before the feed's
+# high-water mark, so incidents reported late still make it in; the natural key
+# turns the overlap into no-ops.
+LATE_REPORT_MARGIN = timedelta(days=30)
+
 # prefferences
 # id
 # hobbies  (Thins you already do)
@@ -30,11 +41,14 @@ class Event(db.Model):
     capacity: so.Mapped[Optional[int]] = so.mapped_column(nullable=True)
     current_registered: so.Mapped[int] = so.mapped_column(default=0)
     description: so.Mapped[str] = so.mapped_column(sa.Text, nullable=False)
-    start_time: so.Mapped[datetime] = so.mapped_column(nullable=False)
+    start_time: so.Mapped[datetime] = so.mapped_column(nullable=False, index=True)
     end_time: so.Mapped[Optional[datetime]] = so.mapped_column(nullable=True)
     created_at: so.Mapped[datetime] = so.mapped_column(
         default=lambda: datetime.now(timezone.utc)
     )
+    # Set when an event is edited; worker processes compare max(updated_at) to
+    # notice that their event grid is out of date (see app.events.spatial).
+    updated_at: so.Mapped[Optional[datetime]] = so.mapped_column(index=True)
 
     # creator one to many
     creator_id: so.Mapped[int] = so.mapped_column(sa.ForeignKey("user.id"), index=True)
@@ -45,7 +59,15 @@ class Event(db.Model):
         secondary="event_attendees", back_populates="events_attending"
     )
 
-    def to_dict(self, user_id=None):
+    def to_dict(self, user_id=None, is_attending=None):
+        """
+        Serialize the event. Pass `is_attending` when it is already known (see
+        serialize_many) to avoid loading the attendees collection.
+        """
+        if is_attending is None:
+            is_attending = (
+                user_id in [user.id for user in self.attendees] if user_id else False
+            )
         return {
             "id": self.id,
             "name": self.name,
@@ -59,11 +81,112 @@ class Event(db.Model):
             "end_time": self.end_time.isoformat() if self.end_time else None,
             "creator_id": self.creator_id,
             "creator_username": self.creator.username if self.creator else None,
-            "is_attending": user_id in [user.id for user in self.attendees]
-            if user_id
-            else False,
+            "is_attending": is_attending,
         }
 
+    @classmethod
+    def select_with_creator(cls):
+        """
+        SELECT for events that loads each creator in the same query.
+        """
+        return sa.select(cls).options(so.joinedload(cls.creator))
+
+    @staticmethod
+    def serialize_many(events, user_id=None):
+        """
+        Serialize a list of events with one query for the current user's
+        attendance, instead of loading every event's attendees.
+
+        Load the events with select_with_creator() so creators are not
+        lazy-loaded one at a time.
+        """
+        attending = set()
+        if user_id and events:
+            attending = set(
+                db.session.scalars(
+                    sa.select(event_attendees.c.event_id).where(
+                        event_attendees.c.user_id == user_id,
+                        event_attendees.c.event_id.in_([event.id for event in events]),
+                    )
+                )
+            )
+        return [event.to_dict(is_attending=event.id in attending) for event in events]
+
+    @classmethod
+    def join(cls, event_id, user_id):
+        """
+        Register `user_id` for the event in one transaction.
+
+        A seat is claimed with a conditional UPDATE (only while below capacity),
+        so concurrent joins can never overbook, and the attendance row is then
+        inserted; if it already exists the primary key conflict rolls the seat
+        back. The event is only read again when the join fails, to say why.
+
+        Returns:
+            str: "joined", "already_attending", "full" or "not_found".
+        """
+        claimed = db.session.execute(
+            sa.update(cls)
+            .where(
+                cls.id == event_id,
+                sa.or_(cls.capacity.is_(None), cls.current_registered < cls.capacity),
+            )
+            .values(current_registered=cls.current_registered + 1)
+            .execution_options(synchronize_session=False)
+        )
+        if claimed.rowcount == 1:
+            try:
+                db.session.execute(
+                    event_attendees.insert().values(event_id=event_id, user_id=user_id)
+                )
+                db.session.commit()
+                return "joined"
+            except sa.exc.IntegrityError:
+                db.session.rollback()
+                return "already_attending"
+
+        db.session.rollback()
+        status = db.session.execute(
+            sa.select(
+                cls.id,
+                sa.exists().where(
+                    event_attendees.c.event_id == event_id,
+                    event_attendees.c.user_id == user_id,
+                ),
+            ).where(cls.id == event_id)
+        ).first()
+        if status is None:
+            return "not_found"
+        return "already_attending" if status[1] else "full"
+
+    @classmethod
+    def leave(cls, event_id, user_id):
+        """
+        Unregister `user_id` from the event and free their seat, in one
+        transaction.
+
+        Returns:
+            bool: False if the user was not attending.
+        """
+        removed = db.session.execute(
+            sa.delete(event_attendees).where(
+                event_attendees.c.event_id == event_id,
+                event_attendees.c.user_id == user_id,
+            )
+        )
+        if removed.rowcount == 0:
+            db.session.rollback()
+            return False
+
+        db.session.execute(
+            sa.update(cls)
+            .where(cls.id == event_id, cls.current_registered > 0)
+            .values(current_registered=cls.current_registered - 1)
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+        return True
+
     def __repr__(self):
         return (
             f"<Event {self.name} at {self.address}, hosted by {self.creator.username}>"
@@ -80,11 +203,22 @@ event_attendees = db.Table(
 
 class Incident(db.Model):
     __tablename__ = "incidents"
+    __table_args__ = (
+        db.Index("ix_incidents_lat_lng", "latitude", "longitude"),
+        # Date-leading, so "incidents since T" (optionally inside a box) is a
+        # range scan over the newest rows only.
+        db.Index("ix_incidents_date_lat_lng", "date", "latitude", "longitude"),
+    )
     id = db.Column(db.Integer, primary_key=True)
     latitude = db.Column(db.Float, nullable=False)
     longitude = db.Column(db.Float, nullable=False)
     severity = db.Column(db.Integer, nullable=False)
     date = db.Column(db.DateTime, nullable=False)
+    # Identifies the same dispatch record across imports (see natural_key_for).
+    natural_key = db.Column(db.String(64), nullable=True, index=True, unique=True)
+
+    # CSV columns holding a stable source record id, in order of preference.
+    SOURCE_ID_COLUMNS = ("objectid", "dc_key")
 
     def __repr__(self):
         return f"<Incident {self.id}: severity {self.severity} at ({self.latitude}, {self.longitude}) on {self.date}>"
@@ -100,6 +234,9 @@ class Incident(db.Model):
           - severity
           - date (in 'YYYY-MM-DD HH:MM:SS' or 'YYYY-MM-DD' format)
 
+        Rows already in the table or in the archive (same natural key) are
+        skipped.
+
         Args:
             file_obj: A file-like object containing the CSV data.
 
@@ -114,29 +251,382 @@ class Incident(db.Model):
 
         incidents = []
         for row in reader:
-            try:
-                latitude = float(row["lat"])
-                longitude = float(row["lng"])
-                severity = int(row["crime_severity"])
-                date_str = row["dispatch_date"].strip()
-
-                # Try parsing the date as a full datetime first, then as a date-only.
-                try:
-                    date_val = datetime.strptime(date_str, "%Y-%m-%d %H:%M:%S")
-                except ValueError:
-                    date_val = datetime.strptime(date_str, "%Y-%m-%d")
-            except Exception:
+            values = cls._parse_csv_row(row)
+            if values is None:
                 # Skip rows with missing or invalid data.
                 continue
 
-            incident = cls(
-                latitude=latitude, longitude=longitude, severity=severity, date=date_val
+            incidents.append(values)
+
+        incidents, _ = cls._without_archived(incidents)
+        imported = 0
+        if incidents:
+            result = db.session.execute(cls._insert_statement(), incidents)
+            imported = result.rowcount if result.rowcount >= 0 else len(incidents)
+        if imported:
+            cls.mark_changed()
+        db.session.commit()
+
+        # The in-memory incident grid and safety raster no longer match the table.
+        from app.main.refresh import incidents_changed
+
+        incidents_changed([(i["latitude"], i["longitude"]) for i in incidents])
+        return imported
+
+    @staticmethod
+    def mark_changed():
+        """
+        Bump the incidents change counter. Call it in the same transaction as
+        every write to the incidents table, so other worker processes rebuild
+        their in-memory structures (see app.main.refresh).
+        """
+        ChangeCounter.bump(ChangeCounter.INCIDENTS)
+
+    @staticmethod
+    def natural_key_for(latitude, longitude, severity, date, source_id=None):
+        """
+        Key identifying one dispatch record across imports.
+
+        Uses the feed's own record id when there is one; otherwise a hash of the
+        location, date and severity, so re-importing the same row is a no-op.
+        Without a source id, distinct incidents that share all four fields
+        collapse into one.
+        """
+        if source_id:
+            return f"src:{source_id}"
+        raw = f"{latitude:.6f}|{longitude:.6f}|{date.isoformat()}|{severity}"
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _without_archived(rows):
+        """
+        Drop rows whose natural key was already moved to incidents_archive, so
+        re-importing an old file doesn't bring archived incidents back into the
+        hot table. The ON CONFLICT clause only sees the incidents table.
+
+        Returns:
+            tuple: (rows to insert, number of archived rows dropped).
+        """
+        keys = [row["natural_key"] for row in rows if row.get("natural_key")]
+        archived = set()
+        for start in range(0, len(keys), ARCHIVE_LOOKUP_CHUNK):
+            archived.update(
+                db.session.scalars(
+                    sa.select(IncidentArchive.natural_key).where(
+                        IncidentArchive.natural_key.in_(
+                            keys[start : start + ARCHIVE_LOOKUP_CHUNK]
+                        )
+                    )
+                )
             )
-            incidents.append(incident)
+        if not archived:
+            return rows, 0
+        kept = [row for row in rows if row.get("natural_key") not in archived]
+        return kept, len(rows) - len(kept)
 
-        db.session.bulk_save_objects(incidents)
+    @classmethod
+    def _insert_statement(cls, upsert=False):
+        """
+        INSERT for the incidents table that skips (or, with `upsert`, updates)
+        rows whose natural key already exists.
+        """
+        dialect = db.session.get_bind().dialect.name
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+        elif dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert
+        elif dialect in ("mysql", "mariadb") and not upsert:
+            return sa.insert(cls.__table__).prefix_with("IGNORE")
+        else:
+            return sa.insert(cls.__table__)
+
+        stmt = insert(cls.__table__)
+        if upsert:
+            return stmt.on_conflict_do_update(
+                index_elements=["natural_key"],
+                set_={
+                    column: stmt.excluded[column]
+                    for column in ("latitude", "longitude", "severity", "date")
+                },
+            )
+        return stmt.on_conflict_do_nothing(index_elements=["natural_key"])
+
+    @staticmethod
+    def _parse_csv_row(row):
+        """
+        Turn one CSV row into Incident column values, or None if the row has
+        missing or invalid data.
+        """
+        try:
+            latitude = float(row["lat"])
+            longitude = float(row["lng"])
+            severity = int(row["crime_severity"])
+            date_str = row["dispatch_date"].strip()
+
+            # Try parsing the date as a full datetime first, then as a date-only.
+            try:
+                date_val = datetime.strptime(date_str, "%Y-%m-%d %H:%M:%S")
+            except ValueError:
+                date_val = datetime.strptime(date_str, "%Y-%m-%d")
+        except Exception:
+            return None
+
+        source_id = next(
+            (
+                row[column].strip()
+                for column in Incident.SOURCE_ID_COLUMNS
+                if (row.get(column) or "").strip()
+            ),
+            None,
+        )
+        return {
+            "latitude": latitude,
+            "longitude": longitude,
+            "severity": severity,
+            "date": date_val,
+            "natural_key": Incident.natural_key_for(
+                latitude, longitude, severity, date_val, source_id
+            ),
+        }
+
+    @classmethod
+    def iter_csv(cls, file_obj, report, skip_rows=0):
+        """
+        Lazily parse incidents from a binary CSV stream.
+
+        The stream is decoded incrementally, so only the current read buffer is
+        held in memory. Yields Incident column values for every valid row after
+        the first `skip_rows` data rows, and counts rows read and rejected in
+        `report`.
+        """
+        stream = io.TextIOWrapper(file_obj, encoding="utf-8", newline="")
+        try:
+            for row in csv.DictReader(stream):
+                report["rows_read"] += 1
+                if report["rows_read"] <= skip_rows:
+                    continue
+                values = cls._parse_csv_row(row)
+                if values is None:
+                    report["rejected"] += 1
+                    continue
+                yield values
+        finally:
+            # Leave the caller's file open.
+            stream.detach()
+
+    # Above this many new rows, a streaming import rebuilds the in-memory incident
+    # structures from scratch instead of refreshing around each new point.
+    STREAM_REFRESH_POINTS = 50000
+
+    @classmethod
+    def import_from_csv_stream(
+        cls,
+        file_obj,
+        batch_size=5000,
+        resume_from=0,
+        progress=None,
+        source=None,
+        upsert=False,
+        late_margin=LATE_REPORT_MARGIN,
+    ):
+        """
+        Import incidents from a CSV file in bounded memory.
+
+        Rows are parsed through a generator and inserted in batches of
+        `batch_size` with a Core executemany, committing after every batch. If an
+        import fails, the last reported "rows_read" is the number of data rows
+        already committed; pass it back as `resume_from` to continue from there.
+        The in-memory incident structures are refreshed for every committed
+        batch, whether or not the import completes.
+
+        Rows whose natural key is already in the table are skipped (or updated
+        with `upsert`), so re-running an import never duplicates incidents.
+        Rows that were archived (see app.main.archive) are skipped as well. When
+        `source` names the feed, the import is incremental: rows dated more than
+        `late_margin` before the feed's recorded high-water mark are skipped
+        without touching the database, and the mark is advanced once the import
+        completes. Rows within the margin go through the natural-key check, so
+        late-reported incidents are still picked up.
+
+        Args:
+            file_obj: A binary file-like object containing the CSV data (same
+                columns as import_from_csv).
+            batch_size: Number of incidents inserted per statement and commit.
+            resume_from: Number of leading data rows to skip.
+            progress: Optional callable receiving a copy of the report after
+                every committed batch.
+            source: Name of the feed for incremental imports (see ImportState).
+            upsert: Update existing rows with the same natural key instead of
+                skipping them.
+            late_margin: timedelta before the high-water mark still imported.
+
+        Returns:
+            dict: "rows_read", "imported", "duplicates", "archived", "stale",
+            "rejected" and "batches" counts.
+        """
+        report = {
+            "rows_read": 0,
+            "imported": 0,
+            "duplicates": 0,
+            "archived": 0,
+            "stale": 0,
+            "rejected": 0,
+            "batches": 0,
+        }
+        insert = cls._insert_statement(upsert=upsert)
+        state = ImportState.get_or_create(source) if source else None
+        cutoff = None
+        if state is not None and state.high_water_mark is not None:
+            cutoff = state.high_water_mark - late_margin
+        newest = None
+        points = []
+
+        from app.main.refresh import incidents_changed
+
+        batch = []
+        try:
+            for values in cls.iter_csv(file_obj, report, skip_rows=resume_from):
+                if cutoff is not None and values["date"] < cutoff:
+                    report["stale"] += 1
+                    continue
+                if newest is None or values["date"] > newest:
+                    newest = values["date"]
+                batch.append(values)
+                if len(batch) >= batch_size:
+                    points = cls._track_points(points, batch)
+                    cls._insert_batch(insert, batch, report, progress)
+                    batch = []
+            if batch:
+                points = cls._track_points(points, batch)
+                cls._insert_batch(insert, batch, report, progress)
+
+            if state is not None:
+                state.advance(newest, report["imported"])
+                db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        finally:
+            # Batches already committed are in the table even if a later one
+            # failed, so the in-memory structures must pick them up either way.
+            if report["batches"]:
+                incidents_changed(points)
+        return report
+
+    @classmethod
+    def _insert_batch(cls, insert, batch, report, progress):
+        batch, archived = cls._without_archived(batch)
+        report["archived"] += archived
+        written = 0
+        if batch:
+            result = db.session.execute(insert, batch)
+            # Some drivers cannot report a row count for executemany.
+            written = result.rowcount if result.rowcount >= 0 else len(batch)
+        if written:
+            cls.mark_changed()
         db.session.commit()
-        return len(incidents)
+
+        report["imported"] += written
+        report["duplicates"] += len(batch) - written
+        report["batches"] += 1
+        if progress is not None:
+            progress(dict(report))
+
+    @classmethod
+    def _track_points(cls, points, batch):
+        """
+        Remember the coordinates of newly imported rows, or give up (None) once
+        there are too many to be worth refreshing around.
+        """
+        if points is None or len(points) + len(batch) > cls.STREAM_REFRESH_POINTS:
+            return None
+        points.extend((values["latitude"], values["longitude"]) for values in batch)
+        return points
+
+
+class IncidentArchive(db.Model):
+    """
+    Cold storage for incidents older than the scoring horizon, moved out of the
+    incidents table by app.main.archive. Nothing on the request path reads it.
+    """
+
+    __tablename__ = "incidents_archive"
+    id = db.Column(db.Integer, primary_key=True)
+    # Id the incident had in the incidents table.
+    incident_id = db.Column(db.Integer, nullable=False)
+    latitude = db.Column(db.Float, nullable=False)
+    longitude = db.Column(db.Float, nullable=False)
+    severity = db.Column(db.Integer, nullable=False)
+    date = db.Column(db.DateTime, nullable=False, index=True)
+    natural_key = db.Column(db.String(64), nullable=True, index=True, unique=True)
+    archived_at = db.Column(db.DateTime, nullable=False)
+
+    def __repr__(self):
+        return f"<IncidentArchive {self.id}: severity {self.severity} on {self.date}>"
+
+
+class ImportState(db.Model):
+    """
+    Per-feed bookkeeping for incremental incident imports.
+    """
+
+    __tablename__ = "import_state"
+
+    source: so.Mapped[str] = so.mapped_column(sa.String(255), primary_key=True)
+    # Newest incident date imported from this feed so far.
+    high_water_mark: so.Mapped[Optional[datetime]] = so.mapped_column()
+    rows_imported: so.Mapped[int] = so.mapped_column(default=0)
+    updated_at: so.Mapped[Optional[datetime]] = so.mapped_column()
+
+    @classmethod
+    def get_or_create(cls, source):
+        state = db.session.get(cls, source)
+        if state is None:
+            state = cls(source=source, rows_imported=0)
+            db.session.add(state)
+        return state
+
+    def advance(self, newest, imported):
+        if newest is not None and (
+            self.high_water_mark is None or newest > self.high_water_mark
+        ):
+            self.high_water_mark = newest
+        self.rows_imported = (self.rows_imported or 0) + imported
+        self.updated_at = datetime.now(timezone.utc)
+
+    def __repr__(self):
+        return f"<ImportState {self.source}: through {self.high_water_mark}>"
+
+
+class ChangeCounter(db.Model):
+    """
+    Counters bumped in the same transaction as writes to a table, so a worker
+    process can tell with one primary key lookup that its in-memory copy of the
+    table is stale. Unlike max(id), they also move on updates and deletes.
+    """
+
+    __tablename__ = "change_counters"
+
+    INCIDENTS = "incidents"
+
+    name: so.Mapped[str] = so.mapped_column(sa.String(64), primary_key=True)
+    value: so.Mapped[int] = so.mapped_column(default=0)
+
+    @classmethod
+    def bump(cls, name):
+        result = db.session.execute(
+            sa.update(cls).where(cls.name == name).values(value=cls.value + 1)
+        )
+        if result.rowcount == 0:
+            db.session.add(cls(name=name, value=1))
+            db.session.flush()
+
+    @classmethod
+    def read(cls, name):
+        return db.session.scalar(sa.select(cls.value).where(cls.name == name)) or 0
+
+    def __repr__(self):
+        return f"<ChangeCounter {self.name}: {self.value}>"
 
 
 class User(UserMixin, db.Model):
@@ -194,6 +684,15 @@ class User(UserMixin, db.Model):
         return "<User {}>".format(self.username)
 
 
+watch_user_model(User)
+
+
 @login.user_loader
 def load_user(id):
-    return db.session.get(User, int(id))
+    """
+    Returns a read-only CachedUser (see app.user_cache), so most authenticated
+    requests don't query the user table at all.
+    """
+    user_cache.ttl = current_app.config.get("USER_CACHE_TTL", 60)
+    user_cache.max_entries = current_app.config.get("USER_CACHE_SIZE", 10000)
+    return user_cache.get(int(id), lambda user_id: db.session.get(User, user_id))
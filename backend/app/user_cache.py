@@ -0,0 +1,131 @@
+"""
+Short-lived cache behind the Flask-Login user loader.
+
+Every authenticated request used to load the User row before the view ran,
+although the hot endpoints (/sloc, /events/, joining an event) only read the
+user's id, location and distance. The loader now hands out a CachedUser, a
+read-only copy of those columns, kept for USER_CACHE_TTL seconds in a bounded
+LRU.
+
+Entries are dropped whenever a User row is inserted, updated or deleted through
+the ORM (registration, location changes, password resets), so this process never
+serves a stale copy. Other worker processes pick the change up within the TTL.
+Views that change the user must load the model itself with
+db.session.get(User, current_user.id).
+"""
+import threading
+import time
+from collections import OrderedDict
+
+import sqlalchemy as sa
+from flask_login import UserMixin
+
+# Columns copied onto CachedUser.
+FIELDS = ("id", "username", "email", "location", "latitude", "longitude", "distance")
+
+
+class CachedUser(UserMixin):
+    """
+    Read-only stand-in for User as current_user.
+    """
+
+    def __init__(self, user):
+        for field in FIELDS:
+            object.__setattr__(self, field, getattr(user, field))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("CachedUser is read-only; load the User model to change it")
+
+    def __repr__(self):
+        return "<CachedUser {}>".format(self.username)
+
+
+class UserCache:
+    def __init__(self, ttl=60, max_entries=10000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # id -> (CachedUser, expires_at)
+        # Bumped by every invalidation, so a load that raced with one is not
+        # stored.
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def get(self, user_id, load):
+        """
+        Return the CachedUser for `user_id`, calling load(user_id) -> User (or
+        None) on a miss. Unknown ids are not cached.
+        """
+        if self.ttl <= 0 or self.max_entries <= 0:
+            user = load(user_id)
+            return CachedUser(user) if user is not None else None
+
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry[1] > now:
+                self._entries.move_to_end(user_id)
+                self.hits += 1
+                return entry[0]
+            generation = self._generation
+
+        self.misses += 1
+        user = load(user_id)
+        if user is None:
+            return None
+        cached = CachedUser(user)
+        with self._lock:
+            if generation != self._generation:
+                return cached
+            self._entries[user_id] = (cached, now + self.ttl)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return cached
+
+    def invalidate(self, user_id=None):
+        """
+        Drop one user, or everyone when `user_id` is None.
+        """
+        with self._lock:
+            self._generation += 1
+            if user_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(user_id, None)
+
+    def stats(self):
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+# Process-wide cache; ttl and size are taken from the app config by load_user.
+user_cache = UserCache()
+
+
+def _user_flushed(mapper, connection, target):
+    # Drop the entry right away, and again once the change is committed, so a
+    # concurrent request cannot cache the old row in between.
+    user_cache.invalidate(target.id)
+    session = sa.orm.object_session(target)
+    if session is not None:
+        session.info.setdefault("changed_user_ids", set()).add(target.id)
+
+
+def _after_commit(session):
+    for user_id in session.info.pop("changed_user_ids", ()):
+        user_cache.invalidate(user_id)
+
+
+def _after_rollback(session, previous_transaction):
+    session.info.pop("changed_user_ids", None)
+
+
+def watch_user_model(model):
+    """
+    Invalidate a user's entry whenever `model` (User) is written via the ORM.
+    """
+    for event in ("after_insert", "after_update", "after_delete"):
+        sa.event.listen(model, event, _user_flushed)
+    sa.event.listen(sa.orm.Session, "after_commit", _after_commit)
+    sa.event.listen(sa.orm.Session, "after_soft_rollback", _after_rollback)
@@ -0,0 +1,3 @@
+"""
+Benchmark suite; see benchmarks.run.
+"""
@@ -0,0 +1,232 @@
+"""
+Read/write throughput of the database under parallel load.
+
+Run from the backend directory:
+
+    python -m benchmarks.concurrency --threads 8 --seconds 5
+    python -m benchmarks.concurrency --journal-modes DELETE,WAL --write-share 0.2
+
+For every SQLite journal mode, a fresh database is seeded with users and events
+and `--threads` workers run a mix of reads (the upcoming-events page with its
+attendee counts) and writes (Event.join followed by Event.leave) for
+`--seconds`. Each worker has its own session, as a request would. Reported per
+mode: reads and writes per second, latency percentiles, and how many operations
+failed (typically "database is locked").
+
+With --database-url the same load runs once against that database instead (for
+example a Postgres URL, to check the pool settings); it must be empty apart from
+the schema the benchmark creates.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+os.environ.setdefault("SECRET_KEY", "benchmark")
+
+from benchmarks.run import summarize  # noqa: E402
+
+
+def make_app(database_url, journal_mode):
+    from config import Config
+    from app import create_app, db
+
+    class ConcurrencyConfig(Config):
+        SQLALCHEMY_DATABASE_URI = database_url
+        SQLITE_JOURNAL_MODE = journal_mode
+        TESTING = True
+
+    app = create_app(ConcurrencyConfig)
+    with app.app_context():
+        db.create_all()
+    return app
+
+
+def seed(app, n_users, n_events, seed):
+    import sqlalchemy as sa
+    from app import db
+    from app.models import Event, User
+    from benchmarks.synthetic import iter_event_rows, random_points
+
+    with app.app_context():
+        db.session.execute(
+            sa.insert(User),
+            [
+                {
+                    "username": f"load{i}",
+                    "email": f"load{i}@example.com",
+                    "latitude": lat,
+                    "longitude": lng,
+                    "distance": 2.0,
+                }
+                for i, (lat, lng) in enumerate(random_points(n_users, seed))
+            ],
+        )
+        user_ids = db.session.execute(sa.select(User.id)).scalars().all()
+        rows = list(iter_event_rows(n_events, user_ids, seed))
+        for row in rows:
+            # Keep seats free so joins exercise the write path, not the "full" one.
+            row["capacity"] = None
+        db.session.execute(sa.insert(Event), rows)
+        db.session.commit()
+        event_ids = db.session.execute(sa.select(Event.id)).scalars().all()
+    return user_ids, event_ids
+
+
+def read_upcoming(db):
+    """
+    The query behind GET /events/: the next page of upcoming events and how many
+    people attend each.
+    """
+    import sqlalchemy as sa
+    from app.models import Event, event_attendees
+
+    attendees = (
+        sa.select(sa.func.count())
+        .where(event_attendees.c.event_id == Event.id)
+        .scalar_subquery()
+    )
+    db.session.execute(
+        sa.select(Event.id, Event.name, Event.current_registered, attendees)
+        .where(Event.start_time >= datetime.utcnow())
+        .order_by(Event.start_time)
+        .limit(25)
+    ).all()
+    db.session.rollback()
+
+
+def join_and_leave(event_id, user_id):
+    from app.models import Event
+
+    Event.join(event_id, user_id)
+    Event.leave(event_id, user_id)
+
+
+def worker(app, index, args, user_ids, event_ids, deadline, results):
+    from app import db
+
+    rnd = random.Random(args.seed + index)
+    reads, writes, read_errors, write_errors = [], [], 0, 0
+    # Each worker owns a user, so two workers never race for the same
+    # attendance row and every join really writes.
+    user_id = user_ids[index % len(user_ids)]
+    with app.app_context():
+        while time.perf_counter() < deadline:
+            is_write = rnd.random() < args.write_share
+            start = time.perf_counter()
+            try:
+                if is_write:
+                    join_and_leave(rnd.choice(event_ids), user_id)
+                else:
+                    read_upcoming(db)
+            except Exception:
+                db.session.rollback()
+                if is_write:
+                    write_errors += 1
+                else:
+                    read_errors += 1
+                continue
+            (writes if is_write else reads).append(time.perf_counter() - start)
+        db.session.remove()
+    results[index] = (reads, writes, read_errors, write_errors)
+
+
+def run_load(app, label, args, user_ids, event_ids):
+    from app import db
+
+    results = [None] * args.threads
+    deadline = time.perf_counter() + args.seconds
+    threads = [
+        threading.Thread(
+            target=worker, args=(app, i, args, user_ids, event_ids, deadline, results)
+        )
+        for i in range(args.threads)
+    ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - start
+
+    reads = [s for r in results for s in r[0]]
+    writes = [s for r in results for s in r[1]]
+    with app.app_context():
+        db.engine.dispose()
+    return [
+        {
+            "benchmark": f"concurrent_reads[{label}]",
+            "size": args.threads,
+            **summarize(reads, wall, sum(r[2] for r in results)),
+        },
+        {
+            "benchmark": f"concurrent_writes[{label}]",
+            "size": args.threads,
+            **summarize(writes, wall, sum(r[3] for r in results)),
+        },
+    ]
+
+
+def run(args):
+    targets = []
+    if args.database_url:
+        targets.append((args.database_url.split(":", 1)[0], args.database_url, None))
+    else:
+        workdir = tempfile.mkdtemp(prefix="phillyflow-concurrency-")
+        for mode in args.journal_modes:
+            url = "sqlite:///" + os.path.join(workdir, f"{mode.lower()}.db")
+            targets.append((f"sqlite-{mode.lower()}", url, mode))
+
+    results = []
+    for label, url, journal_mode in targets:
+        app = make_app(url, journal_mode)
+        user_ids, event_ids = seed(app, max(args.threads, 10), args.events, args.seed)
+        print(f"== {label}: {args.threads} threads, {args.write_share:.0%} writes")
+        for result in run_load(app, label, args, user_ids, event_ids):
+            results.append(result)
+            print(
+                f"   {result['benchmark']}: {result['throughput_per_s']}/s, "
+                f"p50 {result['p50_ms']} ms, p95 {result['p95_ms']} ms, "
+                f"{result['errors']} errors"
+            )
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=5.0, help="Load duration per mode")
+    parser.add_argument(
+        "--write-share",
+        type=float,
+        default=0.2,
+        help="Fraction of operations that join and leave an event (default 0.2)",
+    )
+    parser.add_argument("--events", type=int, default=200)
+    parser.add_argument(
+        "--journal-modes",
+        default="DELETE,WAL",
+        help="SQLite journal modes to compare (default: DELETE,WAL)",
+    )
+    parser.add_argument("--database-url", help="Run once against this database instead")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Also write the results to this JSON file")
+    args = parser.parse_args(argv)
+    args.journal_modes = [mode.strip().upper() for mode in args.journal_modes.split(",")]
+
+    results = run(args)
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w") as f:
+            json.dump({"meta": vars(args), "results": results}, f, indent=2)
+        print(f"Wrote {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
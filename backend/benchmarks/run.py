@@ -0,0 +1,486 @@
+"""
+Benchmarks for the geospatial endpoints on synthetic data.
+
+Run from the backend directory:
+
+    python -m benchmarks.run --sizes 10k,100k --requests 200
+    python -m benchmarks.run --sizes 1m,5m --requests 50 --output big.json
+    python -m benchmarks.run --compare old.json new.json
+
+For every incident count, a synthetic cleaned_data-style CSV is generated and
+imported into a fresh SQLite database (timing Incident.import_from_csv and
+import_from_csv_stream), events and users are added, and then
+/incidents_by_coords, /area_safety, /sloc, /sloc/async and /events/ are called through the
+Flask test client. Google Geocoding and Places are served by the local stub in
+app.main.google_stub, so no API key or network access is needed.
+
+Results are written as JSON (default: benchmarks/results/<timestamp>.json) and
+two result files can be compared with --compare.
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+# Set before the app is imported: config.py and the Google modules read these at
+# import time.
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.environ.setdefault("GOOGLE_API_KEY", "benchmark")
+os.environ.setdefault("GOOGLE_NEARBY_API", "benchmark")
+# The stub answers instantly; don't let the production rate limit dominate.
+os.environ.setdefault("GEOCODE_RATE_LIMIT", "100000")
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_RESULTS_DIR = os.path.join(BENCH_DIR, "results")
+
+BENCH_PASSWORD = "benchmark"
+
+
+def parse_size(text):
+    """
+    "10000", "10k" or "5m" -> int.
+    """
+    text = text.strip().lower()
+    scale = {"k": 1_000, "m": 1_000_000}.get(text[-1:], 1)
+    if scale != 1:
+        text = text[:-1]
+    return int(float(text) * scale)
+
+
+def percentile(sorted_samples, q):
+    if not sorted_samples:
+        return None
+    index = min(len(sorted_samples) - 1, int(round(q * (len(sorted_samples) - 1))))
+    return sorted_samples[index]
+
+
+def summarize(samples, wall_seconds, errors=0):
+    """
+    Latency percentiles (milliseconds) and throughput for a list of durations.
+    """
+    ordered = sorted(samples)
+    ms = lambda seconds: round(seconds * 1000, 3) if seconds is not None else None
+    return {
+        "count": len(samples),
+        "errors": errors,
+        "mean_ms": ms(sum(samples) / len(samples)) if samples else None,
+        "p50_ms": ms(percentile(ordered, 0.50)),
+        "p95_ms": ms(percentile(ordered, 0.95)),
+        "p99_ms": ms(percentile(ordered, 0.99)),
+        "min_ms": ms(ordered[0]) if ordered else None,
+        "max_ms": ms(ordered[-1]) if ordered else None,
+        "throughput_per_s": round(len(samples) / wall_seconds, 2) if wall_seconds else None,
+    }
+
+
+@contextlib.contextmanager
+def quiet():
+    """
+    Swallow the routes' print() output so terminal I/O isn't measured.
+    """
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+
+def make_app(db_path):
+    from config import Config
+    from app import create_app, db
+
+    class BenchmarkConfig(Config):
+        SQLALCHEMY_DATABASE_URI = "sqlite:///" + db_path
+        TESTING = True
+
+    app = create_app(BenchmarkConfig)
+    ctx = app.app_context()
+    ctx.push()
+    db.create_all()
+    return app, ctx
+
+
+def reset_process_state():
+    """
+    Drop every process-wide cache, so each database starts cold.
+    """
+    from app.main.spatial_index import incident_index
+    from app.main.heat_grid import safety_grid
+    from app.main.find_locations import courts_cache
+    from app.main.geocoding import get_geocode_cache
+    from app.events.spatial import event_index
+
+    incident_index.invalidate()
+    safety_grid.invalidate()
+    event_index.invalidate()
+    courts_cache.clear()
+    get_geocode_cache().clear()
+
+
+def bench_import(method, csv_path, db_path, size):
+    """
+    Import the CSV into a fresh database with Incident.<method>.
+    """
+    from app import db
+    from app.models import Incident
+
+    reset_process_state()
+    app, ctx = make_app(db_path)
+    try:
+        with open(csv_path, "rb") as f, quiet():
+            start = time.perf_counter()
+            result = getattr(Incident, method)(f)
+            elapsed = time.perf_counter() - start
+        imported = result["imported"] if isinstance(result, dict) else result
+        return {
+            "benchmark": f"Incident.{method}",
+            "size": size,
+            "seconds": round(elapsed, 3),
+            "rows_per_s": round(size / elapsed, 1) if elapsed else None,
+            "imported": imported,
+        }
+    finally:
+        db.session.remove()
+        ctx.pop()
+
+
+def seed_users_and_events(n_users, n_events, seed):
+    """
+    Add `n_users` users (the first one is the logged-in benchmark user) and
+    `n_events` events with random attendees.
+    """
+    import sqlalchemy as sa
+    from app import db
+    from app.models import Event, User, event_attendees
+    from benchmarks.synthetic import iter_event_rows, random_points
+
+    first = User(username="bench0", email="bench0@example.com")
+    first.set_password(BENCH_PASSWORD)
+    points = random_points(n_users, seed)
+    db.session.execute(
+        sa.insert(User),
+        [
+            {
+                "username": f"bench{i}",
+                "email": f"bench{i}@example.com",
+                "password_hash": first.password_hash,
+                "latitude": lat,
+                "longitude": lng,
+                "distance": 2.0,
+            }
+            for i, (lat, lng) in enumerate(points)
+        ],
+    )
+    user_ids = db.session.execute(sa.select(User.id)).scalars().all()
+
+    db.session.execute(
+        sa.insert(Event), list(iter_event_rows(n_events, user_ids, seed))
+    )
+    rnd = random.Random(seed)
+    attendance = []
+    for event_id, capacity in db.session.execute(sa.select(Event.id, Event.capacity)):
+        attendees = rnd.sample(user_ids, min(len(user_ids), rnd.randint(0, capacity or 10)))
+        attendance.extend({"user_id": u, "event_id": event_id} for u in attendees)
+        db.session.execute(
+            sa.update(Event)
+            .where(Event.id == event_id)
+            .values(current_registered=len(attendees))
+        )
+    if attendance:
+        db.session.execute(event_attendees.insert(), attendance)
+    db.session.commit()
+
+
+def time_requests(name, size, call, iterations, before_each=None):
+    """
+    Time `iterations` calls of call(i), each returning a test client response.
+    The first call is reported separately as the cold start.
+    """
+    with quiet():
+        start = time.perf_counter()
+        response = call(0)
+        cold = time.perf_counter() - start
+
+        samples, errors = [], 0
+        wall = 0.0
+        for i in range(iterations):
+            if before_each:
+                before_each(i)
+            start = time.perf_counter()
+            response = call(i)
+            elapsed = time.perf_counter() - start
+            samples.append(elapsed)
+            wall += elapsed
+            errors += response.status_code >= 400
+
+    return {
+        "benchmark": name,
+        "size": size,
+        "cold_ms": round(cold * 1000, 3),
+        **summarize(samples, wall, errors),
+    }
+
+
+def bench_endpoints(app, size, args):
+    """
+    Time the HTTP endpoints against the current database.
+    """
+    from app.main.find_locations import courts_cache
+    from benchmarks.synthetic import random_points
+
+    client = app.test_client()
+    points = random_points(args.requests + 1, args.seed + 1)
+    radii = [0.1, 0.25, 0.5, 1.0]
+    addresses = [f"{100 + i} Market St, Philadelphia" for i in range(args.addresses)]
+    results = []
+
+    def incidents_by_coords(i):
+        lat, lng = points[i]
+        return client.post(
+            "/incidents_by_coords",
+            json={"lat": lat, "lng": lng, "radius": radii[i % len(radii)]},
+        )
+
+    results.append(
+        time_requests("incidents_by_coords", size, incidents_by_coords, args.requests)
+    )
+
+    def incidents_by_coords_page(i):
+        lat, lng = points[i]
+        return client.post(
+            "/incidents_by_coords",
+            json={"lat": lat, "lng": lng, "radius": 1.0, "limit": 25},
+        )
+
+    results.append(
+        time_requests(
+            "incidents_by_coords?limit=25", size, incidents_by_coords_page, args.requests
+        )
+    )
+
+    def area_safety(i):
+        return client.post(
+            "/area_safety",
+            json={"area": addresses[i % len(addresses)], "radius": radii[i % len(radii)]},
+        )
+
+    results.append(time_requests("area_safety", size, area_safety, args.requests))
+
+    with quiet():
+        login = client.post(
+            "/auth/login",
+            json={"email": "bench0@example.com", "password": BENCH_PASSWORD},
+        )
+    if login.status_code != 200:
+        raise RuntimeError(f"Benchmark login failed: {login.status_code}")
+
+    sloc = lambda i: client.get("/sloc")
+    results.append(time_requests("sloc", size, sloc, args.requests))
+    # Every call goes out to the (stub) Places API.
+    results.append(
+        time_requests(
+            "sloc (uncached courts)",
+            size,
+            sloc,
+            args.requests,
+            before_each=lambda i: courts_cache.clear(),
+        )
+    )
+    sloc_async = lambda i: client.get("/sloc/async")
+    results.append(time_requests("sloc/async", size, sloc_async, args.requests))
+    results.append(
+        time_requests(
+            "sloc/async (uncached courts)",
+            size,
+            sloc_async,
+            args.requests,
+            before_each=lambda i: courts_cache.clear(),
+        )
+    )
+
+    results.append(
+        time_requests("events", size, lambda i: client.get("/events/"), args.requests)
+    )
+    results.append(
+        time_requests(
+            "events?limit=25",
+            size,
+            lambda i: client.get("/events/?limit=25"),
+            args.requests,
+        )
+    )
+    return results
+
+
+def run(args):
+    from app import db
+    from app.main.google_stub import start_stub_server
+    from benchmarks.synthetic import write_incident_csv
+
+    workdir = tempfile.mkdtemp(prefix="phillyflow-bench-")
+    os.environ.setdefault("GEOCODE_CACHE_PATH", os.path.join(workdir, "geocode_cache.db"))
+    server, base_url = start_stub_server(courts_per_query=args.courts)
+    os.environ["GOOGLE_MAPS_BASE_URL"] = base_url
+
+    results = []
+    try:
+        for size in args.sizes:
+            print(f"== {size} incidents")
+            csv_path = write_incident_csv(
+                os.path.join(workdir, f"incidents_{size}.csv"), size, args.seed
+            )
+
+            if not args.skip_legacy_import:
+                results.append(
+                    bench_import(
+                        "import_from_csv",
+                        csv_path,
+                        os.path.join(workdir, f"legacy_{size}.db"),
+                        size,
+                    )
+                )
+                print(f"   {results[-1]}")
+
+            # The streaming import doubles as the seed for the endpoint runs.
+            db_path = os.path.join(workdir, f"bench_{size}.db")
+            results.append(bench_import("import_from_csv_stream", csv_path, db_path, size))
+            print(f"   {results[-1]}")
+
+            reset_process_state()
+            app, ctx = make_app(db_path)
+            try:
+                seed_users_and_events(args.users, args.events, args.seed)
+                for result in bench_endpoints(app, size, args):
+                    results.append(result)
+                    print(
+                        f"   {result['benchmark']}: p50 {result['p50_ms']} ms, "
+                        f"p95 {result['p95_ms']} ms, {result['throughput_per_s']}/s"
+                    )
+            finally:
+                db.session.remove()
+                ctx.pop()
+    finally:
+        server.shutdown()
+
+    return results
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=BENCH_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def write_results(results, args):
+    import numpy
+    import sqlalchemy
+
+    document = {
+        "meta": {
+            "started_at": args.started_at,
+            "git_revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "numpy": numpy.__version__,
+            "sqlalchemy": sqlalchemy.__version__,
+            "sizes": args.sizes,
+            "requests": args.requests,
+            "events": args.events,
+            "users": args.users,
+            "seed": args.seed,
+        },
+        "results": results,
+    }
+    output = args.output or os.path.join(
+        DEFAULT_RESULTS_DIR, f"{args.started_at.replace(':', '')}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(document, f, indent=2)
+    print(f"Wrote {output}")
+
+
+def compare(baseline_path, current_path, threshold):
+    """
+    Print how each benchmark moved between two result files. Returns the number
+    of regressions: p95 latency (or import time) up by more than `threshold`.
+    """
+    def load(path):
+        with open(path) as f:
+            return {(r["benchmark"], r["size"]): r for r in json.load(f)["results"]}
+
+    baseline, current = load(baseline_path), load(current_path)
+    regressions = 0
+    print(f"{'benchmark':<32}{'size':>10}{'before':>12}{'after':>12}{'change':>10}")
+    for key in sorted(baseline.keys() & current.keys(), key=lambda k: (k[1], k[0])):
+        metric = "seconds" if "seconds" in current[key] else "p95_ms"
+        before, after = baseline[key][metric], current[key][metric]
+        if not before or after is None:
+            continue
+        change = after / before - 1
+        flag = ""
+        if change > threshold:
+            regressions += 1
+            flag = "  REGRESSION"
+        print(
+            f"{key[0]:<32}{key[1]:>10}{before:>12.3f}{after:>12.3f}{change:>+10.1%}{flag}"
+        )
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--sizes",
+        default="10k,100k",
+        help="Comma separated incident counts, e.g. 10k,100k,1m,5m (default: 10k,100k)",
+    )
+    parser.add_argument("--requests", type=int, default=200, help="Timed calls per endpoint")
+    parser.add_argument("--events", type=int, default=500)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--courts", type=int, default=25, help="Courts per stub Places query")
+    parser.add_argument("--addresses", type=int, default=50, help="Distinct /area_safety areas")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--skip-legacy-import",
+        action="store_true",
+        help="Don't time Incident.import_from_csv (it holds the whole file in memory)",
+    )
+    parser.add_argument("--output", help="Result file (default: benchmarks/results/<timestamp>.json)")
+    parser.add_argument(
+        "--compare",
+        nargs=2,
+        metavar=("BASELINE", "CURRENT"),
+        help="Compare two result files instead of running",
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.10,
+        help="Relative slowdown reported as a regression by --compare (default 0.10)",
+    )
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        return 1 if compare(*args.compare, args.threshold) else 0
+
+    args.sizes = [parse_size(size) for size in args.sizes.split(",")]
+    args.started_at = datetime.now().strftime("%Y-%m-%dT%H:%M:%S")
+    results = run(args)
+    write_results(results, args)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
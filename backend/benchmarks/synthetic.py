@@ -0,0 +1,105 @@
+"""
+Synthetic Philadelphia data for the benchmarks.
+
+Everything is generated from a seed, so two runs with the same arguments work on
+identical data.
+"""
+import csv
+import random
+from datetime import datetime, timedelta
+
+# Same box as app.main.heat_grid.PHILLY_BOUNDS.
+MIN_LAT, MAX_LAT = 39.86, 40.14
+MIN_LNG, MAX_LNG = -75.29, -74.95
+
+# Incidents cluster around a few hot spots instead of being spread evenly, like
+# the real dispatch data. (lat, lng, spread in degrees, share of incidents)
+HOT_SPOTS = [
+    (39.9526, -75.1652, 0.010, 0.25),  # Center City
+    (39.9907, -75.1300, 0.015, 0.20),  # Kensington
+    (39.9610, -75.2280, 0.012, 0.15),  # West Philadelphia
+    (40.0370, -75.1440, 0.015, 0.10),  # Olney / Logan
+]
+
+# Roughly the severity mix of cleaned_data.csv: mostly minor incidents.
+SEVERITY_WEIGHTS = [30, 20, 14, 10, 8, 6, 5, 3, 2, 2]
+
+HISTORY_DAYS = 730
+
+
+def random_point(rnd):
+    """
+    A point in Philadelphia, drawn from a hot spot or uniformly from the city box.
+    """
+    pick = rnd.random()
+    for lat, lng, spread, share in HOT_SPOTS:
+        if pick < share:
+            return (
+                min(MAX_LAT, max(MIN_LAT, rnd.gauss(lat, spread))),
+                min(MAX_LNG, max(MIN_LNG, rnd.gauss(lng, spread))),
+            )
+        pick -= share
+    return rnd.uniform(MIN_LAT, MAX_LAT), rnd.uniform(MIN_LNG, MAX_LNG)
+
+
+def iter_incident_rows(n, seed=0, now=None):
+    """
+    Yield `n` CSV rows shaped like cleaned_data.csv.
+    """
+    rnd = random.Random(seed)
+    today = (now or datetime.utcnow()).date()
+    for objectid in range(1, n + 1):
+        lat, lng = random_point(rnd)
+        # Recent days are busier than old ones, so the 180-day scoring window
+        # holds a realistic share of the history.
+        age = int(HISTORY_DAYS * rnd.random() ** 1.5)
+        yield {
+            "objectid": objectid,
+            "lat": f"{lat:.6f}",
+            "lng": f"{lng:.6f}",
+            "crime_severity": rnd.choices(range(1, 11), SEVERITY_WEIGHTS)[0],
+            "dispatch_date": (today - timedelta(days=age)).isoformat(),
+        }
+
+
+def write_incident_csv(path, n, seed=0, now=None):
+    """
+    Write `n` synthetic incidents to `path` in the import CSV format.
+    """
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(
+            f, fieldnames=["objectid", "lat", "lng", "crime_severity", "dispatch_date"]
+        )
+        writer.writeheader()
+        writer.writerows(iter_incident_rows(n, seed, now))
+    return path
+
+
+def random_points(n, seed=0):
+    rnd = random.Random(seed)
+    return [random_point(rnd) for _ in range(n)]
+
+
+def iter_event_rows(n, creator_ids, seed=0, now=None):
+    """
+    Yield `n` Event column dicts spread over the next month (and the past week).
+    """
+    rnd = random.Random(seed)
+    now = now or datetime.utcnow()
+    for i in range(n):
+        lat, lng = random_point(rnd)
+        start = now + timedelta(hours=rnd.randint(-7 * 24, 30 * 24))
+        capacity = rnd.choice([None, 10, 20, 50])
+        yield {
+            "name": f"Pickup game {i + 1}",
+            "address": f"{rnd.randint(100, 9999)} Synthetic St, Philadelphia",
+            "latitude": lat,
+            "longitude": lng,
+            "capacity": capacity,
+            "current_registered": 0,
+            "description": "Synthetic benchmark event",
+            "start_time": start,
+            "end_time": start + timedelta(hours=2),
+            "created_at": now,
+            "creator_id": rnd.choice(creator_ids),
+        }
@@ -28,3 +28,79 @@ class Config:
     SQLALCHEMY_DATABASE_URI = os.environ.get(
         "DATABASE_URL"
     ) or "sqlite:///" + os.path.join(basedir, "app.db")
+    # SQLite connection pragmas (see app.database). WAL lets reads carry on while
+    # a write is in progress; NORMAL sync is safe in WAL mode and skips an fsync
+    # per commit. cache_size is negative KiB (64 MiB), mmap_size is bytes.
+    SQLITE_JOURNAL_MODE = os.environ.get("SQLITE_JOURNAL_MODE", "WAL")
+    SQLITE_SYNCHRONOUS = os.environ.get("SQLITE_SYNCHRONOUS", "NORMAL")
+    SQLITE_CACHE_SIZE = int(os.environ.get("SQLITE_CACHE_SIZE", -64 * 1024))
+    SQLITE_MMAP_SIZE = int(os.environ.get("SQLITE_MMAP_SIZE", 256 * 1024 * 1024))
+    SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get("SQLITE_BUSY_TIMEOUT_MS", 5000))
+    # Connection pool for Postgres and other server databases.
+    DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", 10))
+    DB_MAX_OVERFLOW = int(os.environ.get("DB_MAX_OVERFLOW", 20))
+    DB_POOL_TIMEOUT = int(os.environ.get("DB_POOL_TIMEOUT", 30))
+    DB_POOL_RECYCLE = int(os.environ.get("DB_POOL_RECYCLE", 1800))
+    DB_POOL_PRE_PING = os.environ.get("DB_POOL_PRE_PING", "1").lower() not in (
+        "0",
+        "false",
+        "no",
+    )
+    # Keep an in-memory grid of incidents for radius queries. When disabled, radius
+    # queries go to the database with a bounding-box WHERE clause instead.
+    INCIDENT_INDEX_ENABLED = os.environ.get(
+        "INCIDENT_INDEX_ENABLED", "1"
+    ).lower() not in ("0", "false", "no")
+    # Side length (in degrees) of the cells used by the in-memory incident index.
+    INCIDENT_INDEX_CELL_DEGREES = float(
+        os.environ.get("INCIDENT_INDEX_CELL_DEGREES", 0.01)
+    )
+    # How often (seconds) a worker without shared snapshots checks whether other
+    # workers changed the incidents table, and rebuilds its grid if so.
+    INCIDENT_INDEX_POLL_SECONDS = float(
+        os.environ.get("INCIDENT_INDEX_POLL_SECONDS", 5.0)
+    )
+    # Directory for memory-mapped incident snapshots shared by all worker
+    # processes (see app.main.incident_snapshot). Unset: each process reads the
+    # incidents table itself.
+    INCIDENT_SNAPSHOT_DIR = os.environ.get("INCIDENT_SNAPSHOT_DIR") or None
+    INCIDENT_SNAPSHOT_KEEP = int(os.environ.get("INCIDENT_SNAPSHOT_KEEP", 3))
+    INCIDENT_SNAPSHOT_POLL_SECONDS = float(
+        os.environ.get("INCIDENT_SNAPSHOT_POLL_SECONDS", 2.0)
+    )
+    # How often (seconds) a worker checks whether other workers changed the
+    # events behind its /events/nearby grid.
+    EVENT_INDEX_POLL_SECONDS = float(os.environ.get("EVENT_INDEX_POLL_SECONDS", 5.0))
+    # Precomputed safety raster: cell size (degrees), incident radius (miles) and
+    # cells per side of a tile served by /safety_grid/tile.
+    SAFETY_GRID_CELL_DEGREES = float(os.environ.get("SAFETY_GRID_CELL_DEGREES", 0.005))
+    SAFETY_GRID_RADIUS = float(os.environ.get("SAFETY_GRID_RADIUS", 0.2))
+    SAFETY_GRID_TILE_CELLS = int(os.environ.get("SAFETY_GRID_TILE_CELLS", 32))
+    # Cache of /area_safety and /incidents_by_coords responses: "memory"
+    # (per process), "sqlite" (shared by the workers on one host) or "none".
+    RESPONSE_CACHE_BACKEND = os.environ.get("RESPONSE_CACHE_BACKEND", "memory")
+    RESPONSE_CACHE_PATH = os.environ.get("RESPONSE_CACHE_PATH") or None
+    RESPONSE_CACHE_MAX_BYTES = int(
+        os.environ.get("RESPONSE_CACHE_MAX_BYTES", 32 * 1024 * 1024)
+    )
+    RESPONSE_CACHE_TTL = float(os.environ.get("RESPONSE_CACHE_TTL", 3600))
+    RESPONSE_CACHE_COORD_DECIMALS = int(
+        os.environ.get("RESPONSE_CACHE_COORD_DECIMALS", 5)
+    )
+    # Flask-Login user cache (app.user_cache): seconds an entry is trusted, which
+    # bounds how long other worker processes can see an outdated user, and the
+    # maximum number of users kept. A TTL of 0 disables the cache.
+    USER_CACHE_TTL = float(os.environ.get("USER_CACHE_TTL", 60))
+    USER_CACHE_SIZE = int(os.environ.get("USER_CACHE_SIZE", 10000))
+    # /sloc/async: overall deadline (seconds) after which partial results are
+    # returned, and how many upstream calls or scoring jobs run at once.
+    SLOC_DEADLINE_SECONDS = float(os.environ.get("SLOC_DEADLINE_SECONDS", 3.0))
+    SLOC_CONCURRENCY = int(os.environ.get("SLOC_CONCURRENCY", 4))
+    # Record request, SQL and Google API timings and serve them on /metrics.
+    METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "1").lower() not in (
+        "0",
+        "false",
+        "no",
+    )
+    # Bearer token a scraper must send to read /metrics; unset, /metrics is 404.
+    METRICS_TOKEN = os.environ.get("METRICS_TOKEN") or None
@@ -0,0 +1,34 @@
+"""recount event registrations
+
+Revision ID: e41b7c9a2f58
+Revises: d728efa2b36e
+Create Date: 2026-10-18 10:22:41.906312
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e41b7c9a2f58'
+down_revision = 'd728efa2b36e'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Leaving an event never decremented current_registered; recompute it from
+    # the attendee rows so Event.join's capacity check starts from real counts.
+    event = sa.table('event', sa.column('id', sa.Integer), sa.column('current_registered', sa.Integer))
+    attendees = sa.table('event_attendees', sa.column('event_id', sa.Integer))
+    op.execute(
+        event.update().values(
+            current_registered=sa.select(sa.func.count())
+            .where(attendees.c.event_id == event.c.id)
+            .scalar_subquery()
+        )
+    )
+
+
+def downgrade():
+    pass
@@ -0,0 +1,103 @@
+import os
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+
+# config.py writes a generated key to .env when none is set.
+os.environ.setdefault("SECRET_KEY", "test")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config  # noqa: E402
+from app import create_app, db  # noqa: E402
+from app.models import Event, User  # noqa: E402
+from app.events.spatial import event_index  # noqa: E402
+from app.main import refresh  # noqa: E402
+from app.main.heat_grid import safety_grid  # noqa: E402
+from app.main.response_cache import response_cache  # noqa: E402
+from app.main.spatial_index import incident_index  # noqa: E402
+from app.user_cache import user_cache  # noqa: E402
+
+PASSWORD = "password"
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    # create_app writes logs/ into the working directory.
+    monkeypatch.chdir(tmp_path)
+
+    class TestConfig(Config):
+        SQLALCHEMY_DATABASE_URI = "sqlite:///" + str(tmp_path / "test.db")
+        TESTING = True
+        INCIDENT_SNAPSHOT_DIR = None
+        RESPONSE_CACHE_BACKEND = "memory"
+        USER_CACHE_TTL = 60
+
+    app = create_app(TestConfig)
+    with app.app_context():
+        db.create_all()
+    # Process-wide caches outlive the per-test database.
+    user_cache.invalidate()
+    event_index.invalidate()
+    incident_index.invalidate()
+    safety_grid.invalidate()
+    response_cache.configure(app.config)
+    monkeypatch.setattr(refresh, "_marker", None)
+    monkeypatch.setattr(refresh, "_checked_at", 0.0)
+    yield app
+    user_cache.invalidate()
+    event_index.invalidate()
+    with app.app_context():
+        db.session.remove()
+        db.engine.dispose()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def make_user(app):
+    def make_user(name):
+        with app.app_context():
+            user = User(username=name, email=f"{name}@example.com")
+            user.set_password(PASSWORD)
+            db.session.add(user)
+            db.session.commit()
+            return user.id
+
+    return make_user
+
+
+@pytest.fixture
+def make_event(app):
+    def make_event(creator_id, capacity=None):
+        with app.app_context():
+            start = datetime.utcnow() + timedelta(days=1)
+            event = Event(
+                name="Pickup game",
+                address="1 Test St, Philadelphia",
+                latitude=39.95,
+                longitude=-75.16,
+                capacity=capacity,
+                current_registered=0,
+                description="Test event",
+                start_time=start,
+                end_time=start + timedelta(hours=2),
+                creator_id=creator_id,
+            )
+            db.session.add(event)
+            db.session.commit()
+            return event.id
+
+    return make_event
+
+
+def login(client, name):
+    response = client.post(
+        "/auth/login", json={"email": f"{name}@example.com", "password": PASSWORD}
+    )
+    assert response.status_code == 200
+    return response
@@ -0,0 +1,45 @@
+"""
+Re-importing a CSV after its rows were archived leaves them in the archive.
+"""
+import io
+from datetime import datetime
+
+import sqlalchemy as sa
+
+from app import db
+from app.main.archive import archive_incidents
+from app.models import Incident, IncidentArchive
+
+CSV = (
+    b"objectid,lat,lng,crime_severity,dispatch_date\n"
+    b"1,39.9501,-75.1601,5,2020-01-01\n"
+    b"2,39.9502,-75.1602,3,2020-01-02\n"
+    b"3,39.9503,-75.1603,4,2020-01-03\n"
+)
+
+
+def count(model):
+    return db.session.scalar(sa.select(sa.func.count()).select_from(model))
+
+
+def test_stream_import_skips_archived_rows(app):
+    with app.app_context():
+        report = Incident.import_from_csv_stream(io.BytesIO(CSV))
+        assert report["imported"] == 3
+        assert archive_incidents(before=datetime(2021, 1, 1)) == 3
+
+        report = Incident.import_from_csv_stream(io.BytesIO(CSV))
+        assert report["imported"] == 0
+        assert report["archived"] == 3
+        assert count(Incident) == 0
+        assert count(IncidentArchive) == 3
+
+
+def test_import_from_csv_skips_archived_rows(app):
+    with app.app_context():
+        Incident.import_from_csv_stream(io.BytesIO(CSV))
+        archive_incidents(before=datetime(2020, 1, 2, 12))
+
+        Incident.import_from_csv(io.BytesIO(CSV))
+        assert count(Incident) == 1
+        assert count(IncidentArchive) == 2
@@ -0,0 +1,77 @@
+"""
+/sloc/async returns what it has when the deadline passes, whichever page is
+holding it up.
+"""
+import time
+
+import pytest
+
+from app.main import court_pipeline
+from app.main.find_locations import PageTokenNotReady, courts_cache
+
+LAT, LNG = 39.95, -75.16
+
+
+def court(name):
+    return {"name": name, "address": "", "location": {"lat": LAT, "lng": LNG}}
+
+
+@pytest.fixture
+def pipeline(app, monkeypatch):
+    monkeypatch.setattr(
+        court_pipeline, "score_points", lambda points, radius: [1.0] * len(points)
+    )
+    monkeypatch.setattr(court_pipeline, "PAGE_TOKEN_RETRY_SECONDS", 0.05)
+    courts_cache.clear()
+
+    def run(second_page, timeout=0.5):
+        def request_courts_page(lat=None, lng=None, radius_mi=1, page_token=None):
+            if page_token is None:
+                return [court("first")], "token"
+            return second_page()
+
+        monkeypatch.setattr(court_pipeline, "request_courts_page", request_courts_page)
+        with app.app_context():
+            return court_pipeline.courts_with_safety(LAT, LNG, timeout=timeout)
+
+    yield run
+    courts_cache.clear()
+
+
+def test_token_not_ready_returns_first_page(pipeline):
+    def second_page():
+        raise PageTokenNotReady("token")
+
+    result = pipeline(second_page)
+    assert result["incomplete"] is True
+    assert result["pages"] == 1
+    assert [c["name"] for c in result["courts"]] == ["first"]
+    # Incomplete results aren't cached.
+    assert courts_cache.get(LAT, LNG, 0.1) is None
+
+
+def test_slow_page_returns_first_page(pipeline):
+    def second_page():
+        time.sleep(1.0)
+        return [court("second")], None
+
+    start = time.monotonic()
+    result = pipeline(second_page, timeout=0.3)
+    assert time.monotonic() - start < 0.8
+    assert result["incomplete"] is True
+    assert [c["name"] for c in result["courts"]] == ["first"]
+
+
+def test_complete_run_is_cached(pipeline):
+    result = pipeline(lambda: ([court("second")], None))
+    assert result["incomplete"] is False
+    assert [c["name"] for c in result["courts"]] == ["first", "second"]
+    assert len(courts_cache.get(LAT, LNG, 0.1)) == 2
+
+
+def test_upstream_errors_are_raised(pipeline):
+    def second_page():
+        raise RuntimeError("Places API error: OVER_QUERY_LIMIT")
+
+    with pytest.raises(RuntimeError):
+        pipeline(second_page)
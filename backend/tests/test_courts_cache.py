@@ -0,0 +1,51 @@
+"""
+courts_cache only keeps Places results that hold every court of their tile.
+"""
+import pytest
+
+from app.main import find_locations
+from app.main.google_stub import start_stub_server
+
+LAT, LNG = 39.9512, -75.1634
+
+
+@pytest.fixture
+def places_stub(monkeypatch):
+    servers = []
+
+    def start(courts_per_query):
+        server, base_url = start_stub_server(courts_per_query=courts_per_query)
+        servers.append(server)
+        monkeypatch.setenv("GOOGLE_MAPS_BASE_URL", base_url)
+        monkeypatch.setenv("GOOGLE_NEARBY_API", "stub")
+
+    find_locations.courts_cache.clear()
+    yield start
+    find_locations.courts_cache.clear()
+    for server in servers:
+        server.shutdown()
+
+
+def lookups():
+    stats = find_locations.courts_cache.stats()
+    return stats["hits"], stats["misses"]
+
+
+def test_single_page_tile_is_cached(places_stub):
+    places_stub(15)
+    first = find_locations.find_basketball_courts(LAT, LNG, 0.5)
+    hits, misses = lookups()
+    # Nearby point in the same tile: answered from the cache.
+    cached = find_locations.find_basketball_courts(LAT + 0.0001, LNG - 0.0001, 0.5)
+    assert lookups() == (hits + 1, misses)
+    assert first and cached
+
+
+def test_truncated_tile_searches_the_query_circle(places_stub):
+    places_stub(45)
+    courts = find_locations.find_basketball_courts(LAT, LNG, 0.5)
+    assert courts == find_locations.request_basketball_courts(LAT, LNG, 0.5)
+    # Not cached: the next call goes upstream again.
+    hits, misses = lookups()
+    find_locations.find_basketball_courts(LAT, LNG, 0.5)
+    assert lookups() == (hits, misses + 1)
@@ -0,0 +1,52 @@
+"""
+The /events/nearby grid picks up changes made by other worker processes.
+"""
+from datetime import datetime, timezone
+
+import sqlalchemy as sa
+
+from app import db
+from app.events.spatial import event_index
+from app.models import Event
+
+
+def nearby_ids(app):
+    with app.app_context():
+        return [event_id for event_id, _ in event_index.nearby(39.95, -75.16, 1.0)]
+
+
+def test_grid_reloads_after_changes_from_another_worker(app, make_user, make_event):
+    app.config["EVENT_INDEX_POLL_SECONDS"] = 0
+    user_id = make_user("host")
+    first = make_event(user_id)
+    assert nearby_ids(app) == [first]
+
+    # Another worker adds an event, bypassing this process's grid.
+    second = make_event(user_id)
+    assert sorted(nearby_ids(app)) == [first, second]
+
+    # ...moves one out of range by editing it...
+    with app.app_context():
+        db.session.execute(
+            sa.update(Event)
+            .where(Event.id == first)
+            .values(latitude=40.5, updated_at=datetime.now(timezone.utc))
+        )
+        db.session.commit()
+    assert nearby_ids(app) == [second]
+
+    # ...and deletes the other.
+    with app.app_context():
+        db.session.execute(sa.delete(Event).where(Event.id == second))
+        db.session.commit()
+    assert nearby_ids(app) == []
+
+
+def test_grid_is_not_rechecked_within_the_poll_interval(app, make_user, make_event):
+    app.config["EVENT_INDEX_POLL_SECONDS"] = 3600
+    user_id = make_user("host")
+    first = make_event(user_id)
+    assert nearby_ids(app) == [first]
+
+    make_event(user_id)
+    assert nearby_ids(app) == [first]
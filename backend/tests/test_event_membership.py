@@ -0,0 +1,84 @@
+"""
+Join/leave failure paths with the user cache serving current_user.
+"""
+from app import db
+from app.models import Event
+from app.user_cache import user_cache
+from tests.conftest import login
+
+
+def registered(app, event_id):
+    with app.app_context():
+        return db.session.get(Event, event_id).current_registered
+
+
+def test_join_twice_is_rejected(app, client, make_user, make_event):
+    user_id = make_user("alice")
+    event_id = make_event(user_id)
+    login(client, "alice")
+
+    assert client.post(f"/events/join_event/{event_id}").status_code == 200
+    response = client.post(f"/events/join_event/{event_id}")
+
+    assert response.status_code == 400
+    assert response.get_json()["error"] == "User is already attending this event"
+    assert registered(app, event_id) == 1
+    # current_user came from the cache, not a fresh query.
+    assert user_cache.stats()["hits"] > 0
+
+
+def test_join_full_event_is_rejected(app, client, make_user, make_event):
+    host = make_user("host")
+    make_user("bob")
+    event_id = make_event(host, capacity=1)
+    with app.app_context():
+        assert Event.join(event_id, host) == "joined"
+    login(client, "bob")
+
+    response = client.post(f"/events/join_event/{event_id}")
+
+    assert response.status_code == 400
+    assert response.get_json()["error"] == "Event is at full capacity"
+    assert registered(app, event_id) == 1
+
+
+def test_join_missing_event_is_not_found(client, make_user):
+    make_user("carol")
+    login(client, "carol")
+
+    response = client.post("/events/join_event/9999")
+
+    assert response.status_code == 404
+    assert response.get_json()["error"] == "Event not found"
+
+
+def test_leave_without_attending_is_rejected(app, client, make_user, make_event):
+    user_id = make_user("dave")
+    event_id = make_event(user_id)
+    login(client, "dave")
+
+    response = client.post(f"/events/leave_event/{event_id}")
+
+    assert response.status_code == 400
+    assert response.get_json()["error"] == "Not attending this event"
+    assert registered(app, event_id) == 0
+
+
+def test_leave_missing_event_is_rejected(client, make_user):
+    make_user("erin")
+    login(client, "erin")
+
+    response = client.post("/events/leave_event/9999")
+
+    assert response.status_code == 400
+
+
+def test_join_then_leave_frees_the_seat(app, client, make_user, make_event):
+    user_id = make_user("frank")
+    event_id = make_event(user_id, capacity=1)
+    login(client, "frank")
+
+    assert client.post(f"/events/join_event/{event_id}").status_code == 200
+    assert client.post(f"/events/leave_event/{event_id}").status_code == 200
+    assert registered(app, event_id) == 0
+    assert client.post(f"/events/join_event/{event_id}").status_code == 200
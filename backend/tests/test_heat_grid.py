@@ -0,0 +1,52 @@
+"""
+The safety raster can be dropped while requests are reading it.
+"""
+from app.main.heat_grid import SafetyHeatGrid
+
+BOUNDS = (39.94, 39.96, -75.17, -75.15)
+
+
+def make_grid(app):
+    grid = SafetyHeatGrid(bounds=BOUNDS)
+    grid.configure(app.config)
+    return grid
+
+
+def test_lookup_survives_a_concurrent_invalidate(app, monkeypatch):
+    grid = make_grid(app)
+    cell_index = grid.cell_index
+
+    def invalidate_then_index(lat, lng):
+        # Another thread drops the raster between build and read.
+        grid.invalidate()
+        return cell_index(lat, lng)
+
+    monkeypatch.setattr(grid, "cell_index", invalidate_then_index)
+    with app.app_context():
+        assert grid.lookup(39.95, -75.16) == 1.0
+        assert grid.tile(0, 0) is not None
+
+
+def test_describe_survives_a_concurrent_invalidate(app, monkeypatch):
+    grid = make_grid(app)
+    shape = SafetyHeatGrid.shape
+
+    def invalidate_then_shape(self):
+        self.invalidate()
+        return shape.fget(self)
+
+    with app.app_context():
+        grid.lookup(39.95, -75.16)
+        monkeypatch.setattr(SafetyHeatGrid, "shape", property(invalidate_then_shape))
+        assert grid.describe()["built_at"]
+
+
+def test_widespread_refresh_drops_the_raster(app):
+    grid = make_grid(app)
+    with app.app_context():
+        grid.lookup(39.95, -75.16)
+        # Incidents all over the raster: cheaper to rebuild on next use.
+        grid.refresh_around(
+            [(39.941 + 0.004 * i, -75.169 + 0.004 * j) for i in range(5) for j in range(5)]
+        )
+    assert grid.scores is None
@@ -0,0 +1,87 @@
+"""
+Workers without shared snapshots notice incidents imported or archived by
+another process.
+"""
+from datetime import datetime
+
+import sqlalchemy as sa
+
+from app import db
+from app.models import Incident, IncidentArchive
+
+QUERY = {"lat": 39.95, "lng": -75.16, "radius": 0.5}
+
+
+def nearby_count(client):
+    response = client.post("/incidents_by_coords", json=QUERY)
+    assert response.status_code == 200
+    return response.get_json()["count"]
+
+
+def insert_incident(app, latitude=39.9501, longitude=-75.1601):
+    # Core insert: the way another worker's import looks from this process.
+    with app.app_context():
+        result = db.session.execute(
+            sa.insert(Incident).values(
+                latitude=latitude, longitude=longitude, severity=5, date=datetime.utcnow()
+            )
+        )
+        db.session.commit()
+        return result.inserted_primary_key[0]
+
+
+def test_other_workers_import_is_picked_up(app, client):
+    app.config["INCIDENT_INDEX_POLL_SECONDS"] = 0
+    insert_incident(app)
+    assert nearby_count(client) == 1
+
+    insert_incident(app)
+    assert nearby_count(client) == 2
+
+
+def test_other_workers_archive_is_picked_up(app, client):
+    app.config["INCIDENT_INDEX_POLL_SECONDS"] = 0
+    incident_id = insert_incident(app)
+    insert_incident(app)
+    assert nearby_count(client) == 2
+
+    with app.app_context():
+        db.session.execute(
+            sa.insert(IncidentArchive).values(
+                incident_id=incident_id,
+                latitude=39.9501,
+                longitude=-75.1601,
+                severity=5,
+                date=datetime.utcnow(),
+                archived_at=datetime.utcnow(),
+            )
+        )
+        db.session.execute(sa.delete(Incident).where(Incident.id == incident_id))
+        Incident.mark_changed()
+        db.session.commit()
+    assert nearby_count(client) == 1
+
+
+def test_other_workers_update_is_picked_up(app, client):
+    # Upserts and edits keep every id, so only the change counter moves.
+    app.config["INCIDENT_INDEX_POLL_SECONDS"] = 0
+    incident_id = insert_incident(app)
+    insert_incident(app)
+    assert nearby_count(client) == 2
+
+    with app.app_context():
+        db.session.execute(
+            sa.update(Incident).where(Incident.id == incident_id).values(latitude=40.5)
+        )
+        Incident.mark_changed()
+        db.session.commit()
+    assert nearby_count(client) == 1
+
+
+def test_marker_is_not_read_within_the_poll_interval(app, client):
+    app.config["INCIDENT_INDEX_POLL_SECONDS"] = 3600
+    insert_incident(app)
+    assert nearby_count(client) == 1
+
+    insert_incident(app)
+    assert nearby_count(client) == 1
@@ -0,0 +1,34 @@
+"""
+Incremental imports still pick up incidents reported after the last import.
+"""
+import io
+
+from app.models import Incident
+
+HEADER = b"objectid,lat,lng,crime_severity,dispatch_date\n"
+
+
+def csv(*rows):
+    return io.BytesIO(HEADER + b"".join(rows))
+
+
+def test_late_reports_within_the_margin_are_imported(app):
+    with app.app_context():
+        report = Incident.import_from_csv_stream(
+            csv(b"1,39.9501,-75.1601,5,2024-06-30\n"), source="feed"
+        )
+        assert report["imported"] == 1
+
+        report = Incident.import_from_csv_stream(
+            csv(
+                b"1,39.9501,-75.1601,5,2024-06-30\n",
+                # Reported late, dated ten days before the last import's newest.
+                b"2,39.9502,-75.1602,3,2024-06-20\n",
+                # Beyond the margin.
+                b"3,39.9503,-75.1603,4,2024-01-01\n",
+            ),
+            source="feed",
+        )
+        assert report["imported"] == 1
+        assert report["duplicates"] == 1
+        assert report["stale"] == 1
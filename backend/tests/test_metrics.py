@@ -0,0 +1,33 @@
+"""
+/metrics is only served to scrapers holding METRICS_TOKEN, and requests that
+fail with an unhandled exception are still counted.
+"""
+import pytest
+
+from app import metrics
+
+
+def test_metrics_are_hidden_without_a_token(app, client):
+    assert client.get("/metrics").status_code == 404
+
+
+def test_metrics_require_the_token(app, client):
+    app.config["METRICS_TOKEN"] = "secret"
+    assert client.get("/metrics").status_code == 401
+    assert client.get("/metrics", headers={"Authorization": "Bearer nope"}).status_code == 401
+
+    response = client.get("/metrics", headers={"Authorization": "Bearer secret"})
+    assert response.status_code == 200
+    assert b"phillyflow_http_requests_total" in response.data
+
+
+def test_unhandled_exceptions_count_as_500(app, client):
+    def boom():
+        raise RuntimeError("boom")
+
+    app.add_url_rule("/boom", "boom", boom)
+    labels = ("", "boom", "GET", "500")
+    before = metrics.requests_total.value(labels)
+    with pytest.raises(RuntimeError):
+        client.get("/boom")
+    assert metrics.requests_total.value(labels) == before + 1
@@ -0,0 +1,28 @@
+"""
+A streaming import that fails part way still refreshes the in-memory incident
+structures for the batches it committed.
+"""
+import io
+
+import pytest
+
+from app.main import refresh
+from app.models import Incident
+
+ROW = {"lat": "39.9501", "lng": "-75.1601", "crime_severity": "5", "dispatch_date": "2024-06-30"}
+
+
+def test_failed_import_refreshes_committed_batches(app, monkeypatch):
+    changed = []
+    monkeypatch.setattr(refresh, "incidents_changed", lambda points=None: changed.append(points))
+
+    def iter_csv(file_obj, report, skip_rows=0):
+        yield Incident._parse_csv_row(ROW)
+        raise OSError("connection reset")
+
+    monkeypatch.setattr(Incident, "iter_csv", staticmethod(iter_csv))
+    with app.app_context():
+        with pytest.raises(OSError):
+            Incident.import_from_csv_stream(io.BytesIO(b""), batch_size=1)
+        assert changed == [[(39.9501, -75.1601)]]
+        assert Incident.query.count() == 1